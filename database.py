@@ -24,7 +24,18 @@ def _database_url() -> str:
     )
 
 
-engine = create_engine(_database_url(), pool_pre_ping=True)
+# Кэш скомпилированных SQL: запросы на каждый HTTP-запрос (пользователь по id, настройки) не компилируются заново.
+# Пул: запас соединений под всплески запросов админки; при исчерпании запрос ждёт не дольше DB_POOL_TIMEOUT
+# секунд и падает, а не висит. pool_recycle — чтобы не получать соединения, закрытые PostgreSQL по простою.
+engine = create_engine(
+    _database_url(),
+    pool_pre_ping=True,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+    pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    query_cache_size=int(os.getenv("DB_QUERY_CACHE_SIZE", "1200")),
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
 
@@ -227,6 +238,80 @@ def _migrate_support_ticket_user_last_read_at() -> None:
         conn.commit()
 
 
+def _migrate_chats_bundle_index() -> None:
+    """Составной индекс для подсчёта размера бандла: (billing_key, source, user_id, is_global)."""
+    with engine.connect() as conn:
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_chats_billing_key_source_user_global "
+                "ON chats (billing_key, source, user_id, is_global)"
+            )
+        )
+        conn.commit()
+
+
+def _migrate_mentions_filter_indexes() -> None:
+    """Составные индексы упоминаний под фильтры ленты и счётчиков: (user_id, keyword_text|source|is_lead)."""
+    with engine.connect() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_mentions_user_keyword ON mentions (user_id, keyword_text)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_mentions_user_source ON mentions (user_id, source)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_mentions_user_lead ON mentions (user_id, is_lead)"))
+        conn.commit()
+
+
+def _migrate_mentions_user_created_index() -> None:
+    """Индекс ленты упоминаний (user_id, created_at DESC, is_read); одиночный ix_mentions_user_id после него лишний."""
+    with engine.connect() as conn:
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_mentions_user_created_read "
+                "ON mentions (user_id, created_at DESC, is_read)"
+            )
+        )
+        conn.execute(text("DROP INDEX IF EXISTS ix_mentions_user_id"))
+        conn.commit()
+
+
+def _migrate_mentions_message_text_trgm() -> None:
+    """GIN-индекс pg_trgm по mentions.message_text: поиск ILIKE '%...%' в ленте идёт по индексу, а не перебором.
+    CREATE EXTENSION требует прав владельца БД; без расширения индекс не создаём, поиск просто остаётся медленным."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            return
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_mentions_message_text_trgm "
+                "ON mentions USING gin (message_text gin_trgm_ops)"
+            )
+        )
+        conn.commit()
+
+
+def _migrate_support_indexes() -> None:
+    """Составные индексы поддержки: непрочитанные ответы (ticket_id, is_from_staff, created_at)
+    и список тикетов пользователя (user_id, updated_at DESC)."""
+    with engine.connect() as conn:
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_support_messages_ticket_staff_created "
+                "ON support_messages (ticket_id, is_from_staff, created_at)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_support_tickets_user_updated "
+                "ON support_tickets (user_id, updated_at DESC)"
+            )
+        )
+        conn.commit()
+
+
 def _migrate_user_thematic_group_subscriptions() -> None:
     """Создать таблицу подписок на тематические группы и один раз заполнить из текущих подписок на каналы.
     Backfill выполняется только при пустой таблице, чтобы новые пользователи не получали подписки."""
@@ -390,10 +475,15 @@ def init_db() -> None:
     _migrate_mentions_source()
     _migrate_mentions_semantic_similarity()
     _migrate_mentions_semantic_matched_span()
+    _migrate_mentions_filter_indexes()
+    _migrate_mentions_user_created_index()
+    _migrate_mentions_message_text_trgm()
     _migrate_plan_limits()
     _migrate_chats_is_global_and_invite_hash()
     _migrate_chats_billing_key()
+    _migrate_chats_bundle_index()
     _migrate_support_ticket_user_last_read_at()
+    _migrate_support_indexes()
     _migrate_user_thematic_group_subscriptions()
     _migrate_user_chat_subscriptions_via_group_id()
     _migrate_user_chat_subscriptions_enabled()
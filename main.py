@@ -2,26 +2,38 @@ from __future__ import annotations
 
 import asyncio
 import csv
+import hashlib
 import io
 import os
+import re
 import secrets
+import sqlite3
 import threading
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
-from typing import Any, Literal
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Iterable, Iterator, Literal
+from urllib.parse import quote
 
-from fastapi import Depends, FastAPI, File, Form, Header, HTTPException, Query, Request, Response, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi import BackgroundTasks, Depends, FastAPI, File, Form, Header, HTTPException, Query, Request, Response, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field, field_validator
-from sqlalchemy import desc, func, select, update, text
+from sqlalchemy import String, and_, bindparam, case, cast, delete, desc, distinct, exists, func, literal, not_, or_, select, tuple_, update, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.exc import OperationalError, ProgrammingError
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session, raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from telethon import TelegramClient
 from telethon.errors import UserAlreadyParticipantError, InviteRequestSentError, FloodWaitError
+from telethon.crypto import AuthKey
 from telethon.sessions import StringSession
 from telethon.tl.functions.channels import GetFullChannelRequest
 from telethon.tl.functions.channels import JoinChannelRequest
 from telethon.tl.types import PeerChannel
+import orjson
 import socks
 
 from auth_utils import create_token, decode_token, hash_password, verify_password
@@ -29,7 +41,7 @@ from database import get_db, init_db
 from models import Chat, ChatGroup, ExclusionWord, Keyword, Mention, NotificationSettings, PasswordResetToken, User, chat_group_links, user_chat_subscriptions, user_thematic_group_subscriptions, PlanLimit, SupportTicket, SupportMessage, SupportAttachment, CHAT_SOURCE_TELEGRAM, CHAT_SOURCE_MAX
 from parser import TelegramScanner
 from parser_max import MaxScanner
-from plans import PLAN_BASIC, PLAN_FREE, PLAN_ORDER, get_effective_plan, get_limits
+from plans import PLAN_BASIC, PLAN_FREE, PLAN_ORDER, LIMITS, get_effective_plan, get_limits, invalidate_limits_cache, limits_from_row
 from parser_config import (
     get_all_parser_settings,
     get_parser_setting_bool,
@@ -43,11 +55,27 @@ import notify_telegram
 import support_uploads
 
 
+_UTC = timezone.utc
+_EPOCH = datetime(1970, 1, 1, tzinfo=_UTC)
+
+
 def _now_utc() -> datetime:
-    return datetime.now(timezone.utc)
+    return datetime.now(_UTC)
+
+
+def _as_utc(dt: datetime) -> datetime:
+    """Колонки DateTime(timezone=True) уже приходят aware — возвращаем как есть; naive (старые БД) считаем UTC."""
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=_UTC)
 
 
+def _iso_utc(dt: datetime | None) -> str | None:
+    """ISO-строка для API через _as_utc; None — если даты нет."""
+    return _as_utc(dt).isoformat() if dt else None
+
+
+@lru_cache(maxsize=8192)
 def _initials(value: str | None) -> str:
+    # Имена чатов/отправителей повторяются от строки к строке — кэшируем.
     v = (value or "").strip()
     if not v:
         return "??"
@@ -57,18 +85,8 @@ def _initials(value: str | None) -> str:
     return (parts[0][:1] + parts[1][:1]).upper()
 
 
-def _humanize_ru(dt: datetime) -> str:
-    # Простая “человекочитаемая” строка, чтобы фронт мог вывести timestamp как есть.
-    # Фронтенд сейчас использует строки вида "2 мин назад".
-    now = _now_utc()
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    diff = max(0, int((now - dt).total_seconds()))
-    if diff < 10:
-        return "только что"
-    if diff < 60:
-        return f"{diff} сек назад"
-    minutes = diff // 60
+@lru_cache(maxsize=4096)
+def _humanize_minutes_ru(minutes: int) -> str:
     if minutes < 60:
         return f"{minutes} мин назад"
     hours = minutes // 60
@@ -78,6 +96,20 @@ def _humanize_ru(dt: datetime) -> str:
     return f"{days} дн назад"
 
 
+def _humanize_ru(dt: datetime, now: datetime | None = None) -> str:
+    # Простая “человекочитаемая” строка, чтобы фронт мог вывести timestamp как есть.
+    # Фронтенд сейчас использует строки вида "2 мин назад".
+    # now передаётся списочными эндпоинтами один раз на весь ответ.
+    if now is None:
+        now = _now_utc()
+    diff = max(0, int((now - _as_utc(dt)).total_seconds()))
+    if diff < 10:
+        return "только что"
+    if diff < 60:
+        return f"{diff} сек назад"
+    return _humanize_minutes_ru(diff // 60)
+
+
 class KeywordCreate(BaseModel):
     text: str = Field(..., min_length=1, max_length=400)
     useSemantic: bool = False
@@ -214,7 +246,20 @@ class UserUpdate(BaseModel):
     name: str | None = None
     isAdmin: bool | None = None
     plan: str | None = None  # free | basic | pro | business (только админ)
-    planExpiresAt: str | None = None  # ISO datetime или null — снять срок (только админ)
+    planExpiresAt: datetime | None = None  # ISO datetime; null или "" — снять срок (только админ)
+
+    @field_validator("planExpiresAt", mode="before")
+    @classmethod
+    def empty_expires_as_none(cls, v: Any) -> Any:
+        if isinstance(v, str) and v.strip() == "":
+            return None
+        return v
+
+    @field_validator("planExpiresAt")
+    @classmethod
+    def expires_as_utc(cls, v: datetime | None) -> datetime | None:
+        # datetime-local из админки приходит без пояса — считаем UTC
+        return _as_utc(v) if v is not None else None
 
 
 class AdminSetPasswordRequest(BaseModel):
@@ -301,18 +346,23 @@ class SupportTicketStatusUpdate(BaseModel):
 
 
 def _notify_admins_support(
-    db: Session,
     ticket_id: int,
     user_email: str | None,
     user_name: str | None,
     subject: str,
     message_preview: str,
 ) -> None:
-    """Отправить уведомление в Telegram всем администраторам, у которых настроен telegram_chat_id."""
+    """Отправить уведомление в Telegram всем администраторам, у которых настроен telegram_chat_id.
+    Вызывается через BackgroundTasks после ответа, поэтому открывает собственную сессию БД."""
+    from database import SessionLocal
+
     try:
-        admin_ids = [u.id for u in db.scalars(select(User).where(User.is_admin.is_(True))).all()]
-        for uid in admin_ids:
-            settings = db.scalar(select(NotificationSettings).where(NotificationSettings.user_id == uid))
+        with SessionLocal() as db:
+            admin_ids = sorted(_get_admin_ids(db))
+            admin_settings = [
+                db.scalar(select(NotificationSettings).where(NotificationSettings.user_id == uid)) for uid in admin_ids
+            ]
+        for settings in admin_settings:
             if not settings or not settings.telegram_chat_id or not settings.telegram_chat_id.strip():
                 continue
             notify_telegram.send_support_notification(
@@ -353,11 +403,18 @@ def _notify_user_support_reply(db: Session, ticket: SupportTicket, reply_preview
         logging.getLogger(__name__).exception("Ошибка уведомления пользователя об ответе поддержки")
 
 
+# Username Telegram с необязательным "@" и пробелами по краям; всё прочее считаем отсутствием username.
+_USERNAME_CLEAN_RE = re.compile(r"^\s*@*\s*([A-Za-z0-9_]{1,32})\s*$")
+
+
+def _clean_username(value: str | None) -> str | None:
+    m = _USERNAME_CLEAN_RE.match(value) if isinstance(value, str) else None
+    return m.group(1) if m else None
+
+
 def _group_link(chat_username: str | None) -> str | None:
     """Ссылка на группу/канал в Telegram (если есть username)."""
-    if not chat_username or not str(chat_username).strip():
-        return None
-    uname = str(chat_username).strip().lstrip("@")
+    uname = _clean_username(chat_username)
     return f"https://t.me/{uname}" if uname else None
 
 
@@ -627,6 +684,16 @@ class ParserSettingsUpdate(BaseModel):
         return None
 
 
+# Размер пачки при рассылке в WS: между пачками отдаём управление event loop,
+# чтобы сотни клиентов не блокировали обработку остальных запросов.
+_WS_SEND_BATCH = 50
+
+
+def _ws_dumps(payload: dict[str, Any]) -> str:
+    # Тот же компактный UTF-8 JSON, что и у WebSocket.send_json в Starlette, но через orjson.
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 class ConnectionManager:
     def __init__(self) -> None:
         self._connections: set[WebSocket] = set()
@@ -642,27 +709,26 @@ class ConnectionManager:
         self._connections.discard(ws)
         self._ws_user_ids.pop(ws, None)
 
-    async def broadcast(self, payload: dict[str, Any]) -> None:
+    async def broadcast_raw(self, text: str, user_id: int | None = None) -> None:
+        """Отправить уже сериализованное сообщение всем (или только соединениям user_id) пачками по _WS_SEND_BATCH."""
+        if user_id is None:
+            conns = list(self._connections)
+        else:
+            conns = [ws for ws, uid in list(self._ws_user_ids.items()) if uid == user_id]
         dead: list[WebSocket] = []
-        for ws in list(self._connections):
-            try:
-                await ws.send_json(payload)
-            except Exception:
-                dead.append(ws)
+        for i in range(0, len(conns), _WS_SEND_BATCH):
+            batch = conns[i : i + _WS_SEND_BATCH]
+            results = await asyncio.gather(*(ws.send_text(text) for ws in batch), return_exceptions=True)
+            dead.extend(ws for ws, r in zip(batch, results) if isinstance(r, BaseException))
+            await asyncio.sleep(0)
         for ws in dead:
             self.disconnect(ws)
 
+    async def broadcast(self, payload: dict[str, Any]) -> None:
+        await self.broadcast_raw(_ws_dumps(payload))
+
     async def broadcast_to_user(self, user_id: int, payload: dict[str, Any]) -> None:
-        dead: list[WebSocket] = []
-        for ws, uid in list(self._ws_user_ids.items()):
-            if uid != user_id:
-                continue
-            try:
-                await ws.send_json(payload)
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
-            self.disconnect(ws)
+        await self.broadcast_raw(_ws_dumps(payload), user_id=user_id)
 
 
 def _cors_config() -> dict:
@@ -677,7 +743,14 @@ def _cors_config() -> dict:
     return {"allow_origins": [], "allow_origin_regex": r"https?://.*"}
 
 
-app = FastAPI(title="Telegram Monitoring Backend", version="0.1.0")
+class _ORJSONResponse(JSONResponse):
+    """JSON-ответ через orjson: в разы быстрее stdlib json на больших списках упоминаний/тикетов."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+app = FastAPI(title="Telegram Monitoring Backend", version="0.1.0", default_response_class=_ORJSONResponse)
 
 _cors = _cors_config()
 app.add_middleware(
@@ -694,7 +767,10 @@ scanner: TelegramScanner | None = None
 max_scanner: MaxScanner | None = None
 main_loop: asyncio.AbstractEventLoop | None = None
 _TG_LINKED_BACKFILL_FLAG = "TG_LINKED_CHAT_BACKFILL_V1_DONE"
+_TG_LINKED_BACKFILL_COMMIT_EVERY = 500  # промежуточный коммит, чтобы не держать одну огромную транзакцию
+_TG_LINKED_BACKFILL_CONCURRENCY = 4  # параллельных каналов при сборе linked-чатов (больше — чаще FloodWait)
 _linked_backfill_lock = threading.Lock()
+_linked_backfill_write_lock = threading.Lock()  # сериализует фазу записи бэкфилла (см. _backfill_telegram_linked_chats_once)
 _linked_backfill_state: dict[str, Any] = {
     "running": False,
     "lastStartedAt": None,
@@ -704,30 +780,19 @@ _linked_backfill_state: dict[str, Any] = {
 }
 
 
-def _ensure_default_user(db: Session) -> User:
-    user = db.scalar(select(User).where(User.id == 1))
-    if user:
-        return user
-    user = User(id=1, email=None, name="Default", is_admin=True)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+def _ensure_default_user(db: Session) -> None:
+    """Вызывается один раз при старте: создаёт пользователя id=1, если его ещё нет."""
+    if db.scalar(select(User.id).where(User.id == 1)) is None:
+        db.add(User(id=1, email=None, name="Default", is_admin=True))
+        db.commit()
+        _invalidate_admin_ids_cache()
 
 
 def _user_plan_expires_iso(u: User) -> str | None:
-    expires = getattr(u, "plan_expires_at", None)
-    if expires is None:
-        return None
-    if expires.tzinfo is None:
-        expires = expires.replace(tzinfo=timezone.utc)
-    return expires.isoformat()
+    return _iso_utc(getattr(u, "plan_expires_at", None))
 
 
 def _user_to_out(u: User) -> UserOut:
-    created_at = u.created_at
-    if created_at.tzinfo is None:
-        created_at = created_at.replace(tzinfo=timezone.utc)
     plan = get_effective_plan(u)
     plan_slug = getattr(u, "plan_slug", None) or "free"
     return UserOut(
@@ -735,7 +800,7 @@ def _user_to_out(u: User) -> UserOut:
         email=u.email,
         name=u.name,
         isAdmin=bool(u.is_admin),
-        createdAt=created_at.isoformat(),
+        createdAt=_iso_utc(u.created_at),
         plan=plan,
         planSlug=plan_slug,
         planExpiresAt=_user_plan_expires_iso(u),
@@ -811,58 +876,40 @@ def _usage_counts(db: Session, user_id: int) -> dict[str, int]:
     }
 
 
+def _exclusion_word_to_out(e: ExclusionWord) -> ExclusionWordOut:
+    return ExclusionWordOut(id=e.id, text=e.text, createdAt=_iso_utc(e.created_at))
+
+
+def _keyword_to_out(k: Keyword) -> KeywordOut:
+    """KeywordOut по ключевому слову с уже загруженными exclusion_words (selectinload)."""
+    return KeywordOut(
+        id=k.id,
+        text=k.text,
+        useSemantic=getattr(k, "use_semantic", False),
+        userId=k.user_id,
+        createdAt=_iso_utc(k.created_at),
+        enabled=getattr(k, "enabled", True),
+        exclusionWords=[_exclusion_word_to_out(e) for e in k.exclusion_words],
+    )
+
+
 def _keywords_out_by_user_id(db: Session, user_id: int) -> list[KeywordOut]:
+    # Исключения подгружаются одним selectin-запросом; raiseload — чтобы случайный lazy load не дал N+1
     rows = (
         db.scalars(
             select(Keyword)
             .where(Keyword.user_id == user_id)
             .order_by(Keyword.enabled.desc(), Keyword.id.asc())
+            .options(selectinload(Keyword.exclusion_words), raiseload("*"))
         )
     ).all()
-    if not rows:
-        return []
-    kw_ids = [k.id for k in rows]
-    excl_rows = (
-        db.scalars(
-            select(ExclusionWord)
-            .where(ExclusionWord.keyword_id.in_(kw_ids))
-            .order_by(ExclusionWord.keyword_id, ExclusionWord.id)
-        )
-    ).all()
-    excl_by_kw: dict[int, list[ExclusionWordOut]] = {}
-    for e in excl_rows:
-        created_at = e.created_at
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
-        excl_by_kw.setdefault(e.keyword_id, []).append(
-            ExclusionWordOut(id=e.id, text=e.text, createdAt=created_at.isoformat())
-        )
-    out: list[KeywordOut] = []
-    for k in rows:
-        created_at = k.created_at
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
-        out.append(
-            KeywordOut(
-                id=k.id,
-                text=k.text,
-                useSemantic=getattr(k, "use_semantic", False),
-                userId=k.user_id,
-                createdAt=created_at.isoformat(),
-                enabled=getattr(k, "enabled", True),
-                exclusionWords=excl_by_kw.get(k.id, []),
-            )
-        )
-    return out
+    return [_keyword_to_out(k) for k in rows]
 
 
 def _admin_user_channels(db: Session, user_id: int) -> tuple[list[AdminUserChannelOut], list[AdminUserChannelOut]]:
     own_rows = db.scalars(select(Chat).where(Chat.user_id == user_id).order_by(desc(Chat.created_at), Chat.id.desc())).all()
     own: list[AdminUserChannelOut] = []
     for c in own_rows:
-        created_at = c.created_at
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
         own.append(
             AdminUserChannelOut(
                 id=c.id,
@@ -874,7 +921,7 @@ def _admin_user_channels(db: Session, user_id: int) -> tuple[list[AdminUserChann
                 isOwner=True,
                 viaGroupId=None,
                 viaGroupName=None,
-                createdAt=created_at.isoformat(),
+                createdAt=_iso_utc(c.created_at),
             )
         )
 
@@ -892,9 +939,6 @@ def _admin_user_channels(db: Session, user_id: int) -> tuple[list[AdminUserChann
     ).all()
     subs: list[AdminUserChannelOut] = []
     for chat, sub_enabled, via_group_id, via_group_name in sub_rows:
-        created_at = chat.created_at
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
         subs.append(
             AdminUserChannelOut(
                 id=chat.id,
@@ -906,7 +950,7 @@ def _admin_user_channels(db: Session, user_id: int) -> tuple[list[AdminUserChann
                 isOwner=False,
                 viaGroupId=via_group_id,
                 viaGroupName=via_group_name,
-                createdAt=created_at.isoformat(),
+                createdAt=_iso_utc(chat.created_at),
             )
         )
     return own, subs
@@ -963,6 +1007,11 @@ def _check_limits(
         )
 
 
+# Самые частые запросы собраны один раз при импорте: построение Select и ключа кэша компиляции не повторяется.
+_USER_BY_ID = select(User).where(User.id == bindparam("uid"))
+_NOTIFICATION_SETTINGS_BY_USER_ID = select(NotificationSettings).where(NotificationSettings.user_id == bindparam("uid"))
+
+
 def get_current_user(
     authorization: str | None = Header(None, alias="Authorization"),
     db: Session = Depends(get_db),
@@ -973,7 +1022,7 @@ def get_current_user(
     user_id = decode_token(token)
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
-    user = db.scalar(select(User).where(User.id == user_id))
+    user = db.scalar(_USER_BY_ID, {"uid": user_id})
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
@@ -996,10 +1045,9 @@ def _message_link(
     """
     if message_id is None:
         return None
-    if chat_username and str(chat_username).strip():
-        uname = str(chat_username).strip().lstrip("@")
-        if uname:
-            return f"https://t.me/{uname}/{message_id}"
+    uname = _clean_username(chat_username)
+    if uname:
+        return f"https://t.me/{uname}/{message_id}"
     if chat_id is None:
         return None
     cid = abs(chat_id)
@@ -1009,22 +1057,22 @@ def _message_link(
 
 def _user_profile_link(m: Mention) -> str | None:
     """Ссылка на профиль пользователя в Telegram."""
-    if getattr(m, "sender_username", None) and str(m.sender_username).strip():
-        uname = str(m.sender_username).strip().lstrip("@")
-        return f"https://t.me/{uname}" if uname else None
+    uname = _clean_username(m.sender_username)
+    if uname:
+        return f"https://t.me/{uname}"
     if m.sender_id is not None:
         return f"tg://user?id={m.sender_id}"
     return None
 
 
-def _mention_to_front(m: Mention) -> MentionOut:
+def _mention_to_front(m: Mention, now: datetime | None = None) -> MentionOut:
+    if now is None:
+        now = _now_utc()
     group_name = (m.chat_name or m.chat_username or "Неизвестный чат").strip()
     user_name = (m.sender_name or "Неизвестный пользователь").strip()
-    created_at = m.created_at or _now_utc()
-    if created_at.tzinfo is None:
-        created_at = created_at.replace(tzinfo=timezone.utc)
-    source = getattr(m, "source", None) or CHAT_SOURCE_TELEGRAM
-    sim = getattr(m, "semantic_similarity", None)
+    created_at = _as_utc(m.created_at) if m.created_at is not None else now
+    source = m.source or CHAT_SOURCE_TELEGRAM
+    sim = m.semantic_similarity
     topic_pct = round(sim * 100) if sim is not None else None
     return MentionOut(
         id=str(m.id),
@@ -1033,10 +1081,10 @@ def _mention_to_front(m: Mention) -> MentionOut:
         userName=user_name,
         userInitials=_initials(user_name),
         userLink=_user_profile_link(m),
-        senderPhone=(getattr(m, "sender_phone", None) or "").strip() or None,
+        senderPhone=(m.sender_phone or "").strip() or None,
         message=(m.message_text or ""),
         keyword=m.keyword_text,
-        timestamp=_humanize_ru(created_at),
+        timestamp=_humanize_ru(created_at, now),
         isLead=bool(m.is_lead),
         isRead=bool(m.is_read),
         createdAt=created_at.isoformat(),
@@ -1049,8 +1097,10 @@ def _mention_to_front(m: Mention) -> MentionOut:
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    global scanner, max_scanner, main_loop
+    global scanner, max_scanner, main_loop, _ws_queue
     main_loop = asyncio.get_running_loop()
+    _ws_queue = asyncio.Queue()
+    asyncio.create_task(_ws_consumer(_ws_queue))
     init_db()
     import logging
     _startup_log = logging.getLogger(__name__)
@@ -1115,44 +1165,57 @@ async def on_startup() -> None:
     asyncio.create_task(_support_attachments_cleanup_loop())
 
 
-# Троттлинг WS: при пачке упоминаний не планируем сотни broadcast-корутин, а сбрасываем раз в 80 ms
-_ws_pending: list[dict[str, Any]] = []
-_ws_lock = threading.Lock()
-_ws_flush_scheduled = False
-
-
-async def _ws_broadcast_flush() -> None:
-    global _ws_flush_scheduled  # noqa: PLW0603
-    await asyncio.sleep(0.08)
-    with _ws_lock:
-        to_send = _ws_pending[:]
-        _ws_pending.clear()
-        _ws_flush_scheduled = False
-    for p in to_send:
-        if p.get("type") == "mention":
-            uid = (p.get("data") or {}).get("userId")
-            if uid is not None:
-                await ws_manager.broadcast_to_user(int(uid), p)
-            else:
-                await ws_manager.broadcast(p)
-        else:
-            await ws_manager.broadcast(p)
-    with _ws_lock:
-        if _ws_pending and not _ws_flush_scheduled:
-            _ws_flush_scheduled = True
-            asyncio.create_task(_ws_broadcast_flush())
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    # Закрываем общий сервисный TG-клиент (см. _tg_rpc_client)
+    if _tg_client is not None:
+        await _disconnect_tg_client_quietly(_tg_client)
+
+
+# Троттлинг WS: при пачке упоминаний не планируем сотни broadcast-корутин, а копим их в очереди
+# и сбрасываем одним потребителем не чаще раза в 80 ms.
+_WS_COALESCE_SEC = 0.08
+_ws_queue: asyncio.Queue[dict[str, Any]] | None = None
+
+
+async def _ws_send_payload(p: dict[str, Any]) -> None:
+    if p.get("type") == "mention":
+        uid = (p.get("data") or {}).get("userId")
+        if uid is not None:
+            await ws_manager.broadcast_to_user(int(uid), p)
+            return
+    await ws_manager.broadcast(p)
+
+
+async def _ws_consumer(q: asyncio.Queue[dict[str, Any]]) -> None:
+    """Единственный потребитель очереди WS: ждёт первое событие и добирает остальные в окне _WS_COALESCE_SEC."""
+    import logging
+    log = logging.getLogger(__name__)
+    loop = asyncio.get_running_loop()
+    while True:
+        items = [await q.get()]
+        deadline = loop.time() + _WS_COALESCE_SEC
+        while True:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(q.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        for p in items:
+            try:
+                await _ws_send_payload(p)
+            except Exception:
+                log.exception("Ошибка рассылки WebSocket")
 
 
 def _schedule_ws_broadcast(payload: dict[str, Any]) -> None:
-    # Callback из фонового потока (Telethon) -> отправляем в WS асинхронно (с троттлингом).
-    global _ws_flush_scheduled  # noqa: PLW0603
+    # Callback из фонового потока (Telethon) -> кладём в очередь на основном loop (с троттлингом).
     loop = main_loop
-    if loop and loop.is_running():
-        with _ws_lock:
-            _ws_pending.append(payload)
-            if not _ws_flush_scheduled:
-                _ws_flush_scheduled = True
-                asyncio.run_coroutine_threadsafe(_ws_broadcast_flush(), loop)
+    q = _ws_queue
+    if loop and q is not None and loop.is_running():
+        loop.call_soon_threadsafe(q.put_nowait, payload)
     else:
         try:
             asyncio.run(ws_manager.broadcast(payload))
@@ -1184,13 +1247,16 @@ def health() -> dict[str, Any]:
 def _telegram_chat_registered(db: Session, chat_id: int | str) -> bool:
     """Проверить, добавлен ли chat_id в настройках уведомлений какого-либо пользователя (личный кабинет)."""
     sid = str(chat_id).strip()
-    row = db.scalar(
-        select(NotificationSettings).where(
-            NotificationSettings.telegram_chat_id.isnot(None),
-            func.trim(NotificationSettings.telegram_chat_id) == sid,
+    return bool(
+        db.scalar(
+            select(
+                exists().where(
+                    NotificationSettings.telegram_chat_id.isnot(None),
+                    func.trim(NotificationSettings.telegram_chat_id) == sid,
+                )
+            )
         )
     )
-    return row is not None
 
 
 @app.post("/api/telegram-webhook")
@@ -1199,12 +1265,15 @@ async def telegram_webhook(request: Request, db: Session = Depends(get_db)) -> d
     Webhook для бота @telescopemsg_bot: при /start проверяем, добавлен ли пользователь в личном кабинете;
     если нет — инструкция и кнопка «Проверить».
     """
+    # Проверка конфигурации — до разбора тела, чтобы случайные POST не стоили парсинга JSON.
     if not notify_telegram.is_configured():
         return {"ok": True}
     try:
-        body = await request.json()
+        body = orjson.loads(await request.body())
     except Exception:
         return {"ok": False}
+    if not isinstance(body, dict):
+        return {"ok": False}
     # Обработка /start
     message = body.get("message") or {}
     text = (message.get("text") or "").strip()
@@ -1259,7 +1328,6 @@ async def telegram_webhook(request: Request, db: Session = Depends(get_db)) -> d
 
 @app.post("/auth/register", response_model=AuthResponse)
 def auth_register(body: RegisterRequest, db: Session = Depends(get_db)) -> AuthResponse:
-    _ensure_default_user(db)
     existing = db.scalar(select(User).where(User.email == body.email.strip()))
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -1278,6 +1346,8 @@ def auth_register(body: RegisterRequest, db: Session = Depends(get_db)) -> AuthR
     )
     db.add(user)
     db.commit()
+    if is_first_user:
+        _invalidate_admin_ids_cache()
     db.refresh(user)
     return AuthResponse(token=create_token(user.id), user=_user_to_out(user))
 
@@ -1286,7 +1356,6 @@ def auth_register(body: RegisterRequest, db: Session = Depends(get_db)) -> AuthR
 def auth_login(body: LoginRequest, db: Session = Depends(get_db)) -> AuthResponse:
     import logging
     try:
-        _ensure_default_user(db)
         user = db.scalar(select(User).where(User.email == body.email.strip()))
         if not user or not user.password_hash:
             raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -1345,6 +1414,11 @@ def _build_password_reset_link(token: str) -> str:
     return f"{base}/auth/reset-password?token={token}"
 
 
+def _reset_token_digest(token: str) -> str:
+    """В БД храним только blake2b-хэш токена сброса (64 hex-символа), сам токен есть лишь в письме."""
+    return hashlib.blake2b(token.encode(), digest_size=32).hexdigest()
+
+
 def _is_dev_mode() -> bool:
     for key in ("APP_ENV", "PYTHON_ENV", "ENVIRONMENT", "NODE_ENV"):
         val = (os.getenv(key) or "").strip().lower()
@@ -1357,35 +1431,41 @@ def _is_dev_mode() -> bool:
 
 
 @app.post("/auth/forgot-password")
-def forgot_password(body: ForgotPasswordRequest, db: Session = Depends(get_db)) -> dict[str, Any]:
+def forgot_password(
+    body: ForgotPasswordRequest,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+) -> dict[str, Any]:
     """
     Запрос на сброс пароля. Всегда возвращает 200, чтобы не раскрывать наличие email в системе.
-    Если пользователь найден — создаётся токен, отправляется письмо (если настроен SMTP).
+    Если пользователь найден — создаётся токен, письмо отправляется в фоне после ответа (если настроен SMTP).
     """
     email = body.email.strip().lower()
     user = db.scalar(select(User).where(func.lower(User.email) == email))
-    token = secrets.token_urlsafe(32)
-    reset_link = _build_password_reset_link(token)
     response: dict[str, Any] = {
         "ok": True,
         "message": "If an account exists, you will receive an email with instructions.",
     }
-    if _is_dev_mode():
-        response["resetLink"] = reset_link
     if not user or not user.password_hash:
+        if _is_dev_mode():
+            # Ссылка-пустышка, чтобы ответ в dev-режиме не выдавал отсутствие учётной записи.
+            response["resetLink"] = _build_password_reset_link(secrets.token_urlsafe(32))
         return response
+    token = secrets.token_urlsafe(32)
+    reset_link = _build_password_reset_link(token)
+    if _is_dev_mode():
+        response["resetLink"] = reset_link
 
-    # Удаляем старые токены этого пользователя
-    for old in db.scalars(select(PasswordResetToken).where(PasswordResetToken.user_id == user.id)).all():
-        db.delete(old)
+    # Удаляем старые токены этого пользователя одним DELETE
+    db.execute(delete(PasswordResetToken).where(PasswordResetToken.user_id == user.id))
 
     expires_at = _now_utc() + timedelta(hours=RESET_TOKEN_EXPIRE_HOURS)
-    prt = PasswordResetToken(user_id=user.id, token=token, expires_at=expires_at)
+    prt = PasswordResetToken(user_id=user.id, token=_reset_token_digest(token), expires_at=expires_at)
     db.add(prt)
     db.commit()
 
     from email_sender import send_password_reset_email
-    send_password_reset_email(user.email or email, reset_link)
+    background.add_task(send_password_reset_email, user.email or email, reset_link)
 
     return response
 
@@ -1396,7 +1476,7 @@ def reset_password(body: ResetPasswordRequest, db: Session = Depends(get_db)) ->
     now = _now_utc()
     prt = db.scalar(
         select(PasswordResetToken).where(
-            PasswordResetToken.token == body.token.strip(),
+            PasswordResetToken.token == _reset_token_digest(body.token.strip()),
             PasswordResetToken.expires_at > now,
         )
     )
@@ -1416,36 +1496,28 @@ def reset_password(body: ResetPasswordRequest, db: Session = Depends(get_db)) ->
 
 @app.get("/api/stats", response_model=StatsOut)
 def get_stats(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> StatsOut:
-    _ensure_default_user(db)
     now = _now_utc()
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    mentions_today = (
-        db.scalar(
-            select(func.count(Mention.id)).where(
-                Mention.user_id == user.id,
-                Mention.created_at >= today_start,
-            )
-        )
-        or 0
-    )
-    keywords_count = (
-        db.scalar(
-            select(func.count(Keyword.id)).where(
-                Keyword.user_id == user.id,
-                Keyword.enabled.is_(True),
-            )
-        )
-        or 0
-    )
-    leads_count = (
-        db.scalar(
-            select(func.count(Mention.id)).where(
-                Mention.user_id == user.id,
-                Mention.is_lead.is_(True),
-            )
+    # Три счётчика одним запросом: каждый скалярный подзапрос использует свой индекс.
+    row = db.execute(
+        select(
+            select(func.count(Mention.id))
+            .where(Mention.user_id == user.id, Mention.created_at >= today_start)
+            .scalar_subquery()
+            .label("mentions_today"),
+            select(func.count(Keyword.id))
+            .where(Keyword.user_id == user.id, Keyword.enabled.is_(True))
+            .scalar_subquery()
+            .label("keywords_count"),
+            select(func.count(Mention.id))
+            .where(Mention.user_id == user.id, Mention.is_lead.is_(True))
+            .scalar_subquery()
+            .label("leads_count"),
         )
-        or 0
-    )
+    ).one()
+    mentions_today = row.mentions_today or 0
+    keywords_count = row.keywords_count or 0
+    leads_count = row.leads_count or 0
     return StatsOut(
         mentionsToday=mentions_today,
         keywordsCount=keywords_count,
@@ -1453,24 +1525,75 @@ def get_stats(user: User = Depends(get_current_user), db: Session = Depends(get_
     )
 
 
+# Кэш ответа /api/plan: дашборд опрашивает его часто, а _usage_counts — это несколько COUNT.
+# Запись привязана к (plan_slug, plan_expires_at); изменения ресурсов сбрасывают её через _invalidate_plan_cache.
+_PLAN_CACHE_TTL_SEC = 15.0
+_PLAN_CACHE_MAX_USERS = 1024
+_plan_cache: dict[int, tuple[tuple[Any, ...], float, PlanOut]] = {}
+_plan_cache_lock = threading.Lock()
+
+
+def _invalidate_plan_cache(user_id: int | None = None) -> None:
+    """Сбросить кэш /api/plan пользователя (user_id=None — для всех, например после изменения лимитов тарифа)."""
+    with _plan_cache_lock:
+        if user_id is None:
+            _plan_cache.clear()
+        else:
+            _plan_cache.pop(user_id, None)
+
+
+def _plan_limits_out(plan: str, limits_dict: dict[str, Any]) -> PlanLimitsOut:
+    # Словарь из get_limits уже нужных типов — model_construct без повторной валидации
+    return PlanLimitsOut.model_construct(
+        maxGroups=limits_dict["max_groups"],
+        maxChannels=limits_dict["max_channels"],
+        maxKeywordsExact=limits_dict["max_keywords_exact"],
+        maxKeywordsSemantic=limits_dict["max_keywords_semantic"],
+        maxOwnChannels=limits_dict["max_own_channels"],
+        label=limits_dict.get("label", plan),
+    )
+
+
+# Id администраторов: нужны каждому запросу к тематическим группам, а меняются только из админки.
+# Сбрасывается через _invalidate_admin_ids_cache при создании/изменении/удалении пользователя.
+_ADMIN_IDS_CACHE_TTL_SEC = 30.0
+_admin_ids_cache: tuple[float, frozenset[int]] | None = None
+
+
+def _invalidate_admin_ids_cache() -> None:
+    global _admin_ids_cache
+    _admin_ids_cache = None
+    _invalidate_chat_group_catalog()
+
+
+def _get_admin_ids(db: Session) -> frozenset[int]:
+    """Id всех администраторов (кэшируется на _ADMIN_IDS_CACHE_TTL_SEC)."""
+    global _admin_ids_cache
+    now = time.monotonic()
+    cached = _admin_ids_cache
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    ids = frozenset(db.scalars(select(User.id).where(User.is_admin.is_(True))).all())
+    _admin_ids_cache = (now + _ADMIN_IDS_CACHE_TTL_SEC, ids)
+    return ids
+
+
 @app.get("/api/plan", response_model=PlanOut)
 def get_plan(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> PlanOut:
-    """Текущий тариф пользователя, лимиты и использование."""
-    _ensure_default_user(db)
+    """Текущий тариф пользователя, лимиты и использование (кэшируется на _PLAN_CACHE_TTL_SEC)."""
+    key = (user.plan_slug, user.plan_expires_at)
+    now = time.monotonic()
+    with _plan_cache_lock:
+        cached = _plan_cache.get(user.id)
+    if cached is not None and cached[0] == key and cached[1] > now:
+        return cached[2]
     plan = get_effective_plan(user)
     limits_dict = get_limits(plan, db)
     usage = _usage_counts(db, user.id)
-    return PlanOut(
+    out = PlanOut(
         plan=plan,
         planExpiresAt=_user_plan_expires_iso(user),
-        limits=PlanLimitsOut(
-            maxGroups=limits_dict["max_groups"],
-            maxChannels=limits_dict["max_channels"],
-            maxKeywordsExact=limits_dict["max_keywords_exact"],
-            maxKeywordsSemantic=limits_dict["max_keywords_semantic"],
-            maxOwnChannels=limits_dict["max_own_channels"],
-            label=limits_dict.get("label", plan),
-        ),
+        limits=_plan_limits_out(plan, limits_dict),
         usage=PlanUsageOut(
             groups=usage["groups"],
             channels=usage["channels"],
@@ -1479,10 +1602,18 @@ def get_plan(user: User = Depends(get_current_user), db: Session = Depends(get_d
             ownChannels=usage["own_channels"],
         ),
     )
+    with _plan_cache_lock:
+        if len(_plan_cache) >= _PLAN_CACHE_MAX_USERS:
+            for uid in [uid for uid, entry in _plan_cache.items() if entry[1] <= now]:
+                del _plan_cache[uid]
+            if len(_plan_cache) >= _PLAN_CACHE_MAX_USERS:
+                del _plan_cache[next(iter(_plan_cache))]
+        _plan_cache[user.id] = (key, now + _PLAN_CACHE_TTL_SEC, out)
+    return out
 
 
 def _get_or_create_notification_settings(db: Session, user_id: int) -> NotificationSettings:
-    settings = db.scalar(select(NotificationSettings).where(NotificationSettings.user_id == user_id))
+    settings = db.scalar(_NOTIFICATION_SETTINGS_BY_USER_ID, {"uid": user_id})
     if settings:
         return settings
     settings = NotificationSettings(
@@ -1500,7 +1631,6 @@ def _get_or_create_notification_settings(db: Session, user_id: int) -> Notificat
 
 @app.get("/api/notifications/settings", response_model=NotificationSettingsOut)
 def get_notification_settings(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> NotificationSettingsOut:
-    _ensure_default_user(db)
     s = _get_or_create_notification_settings(db, user.id)
     return NotificationSettingsOut(
         notifyEmail=bool(s.notify_email),
@@ -1513,7 +1643,6 @@ def get_notification_settings(user: User = Depends(get_current_user), db: Sessio
 @app.get("/api/notifications/telegram-status")
 def get_telegram_notify_status(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> dict[str, Any]:
     """Статус для отладки: настроен ли бот, задан ли chat_id, совпадает ли user id с парсером."""
-    _ensure_default_user(db)
     s = _get_or_create_notification_settings(db, user.id)
     chat_id = (s.telegram_chat_id or "").strip()
     multi = get_parser_setting_bool("MULTI_USER_SCANNER", True)
@@ -1533,7 +1662,6 @@ def get_telegram_notify_status(user: User = Depends(get_current_user), db: Sessi
 @app.post("/api/notifications/test-telegram")
 def test_telegram_notification(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> dict[str, Any]:
     """Отправить тестовое уведомление в Telegram (для проверки токена и chat_id)."""
-    _ensure_default_user(db)
     if not notify_telegram.is_configured():
         return {"ok": False, "error": "NOTIFY_TELEGRAM_BOT_TOKEN не задан в окружении"}
     s = _get_or_create_notification_settings(db, user.id)
@@ -1555,7 +1683,6 @@ def update_notification_settings(
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> NotificationSettingsOut:
-    _ensure_default_user(db)
     s = _get_or_create_notification_settings(db, user.id)
     if body.notifyEmail is not None:
         s.notify_email = bool(body.notifyEmail)
@@ -1584,7 +1711,6 @@ def update_notification_settings(
 
 @app.get("/api/settings/semantic", response_model=SemanticSettingsOut)
 def get_semantic_settings(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> SemanticSettingsOut:
-    _ensure_default_user(db)
     db.refresh(user)
     return SemanticSettingsOut(
         semanticThreshold=user.semantic_threshold,
@@ -1598,7 +1724,6 @@ def update_semantic_settings(
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> SemanticSettingsOut:
-    _ensure_default_user(db)
     # Обновляем только переданные поля; null означает сброс на глобальные настройки
     sent = body.model_dump(exclude_unset=True)
     if "semanticThreshold" in sent:
@@ -1620,13 +1745,13 @@ def update_semantic_settings(
 
 @app.post("/api/support/tickets", response_model=SupportTicketDetailOut)
 async def create_support_ticket(
+    background: BackgroundTasks,
     subject: str = Form(..., min_length=1, max_length=300),
     message: str = Form(..., min_length=1, max_length=10000),
     files: list[UploadFile] = File(default=[]),
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> SupportTicketDetailOut:
-    _ensure_default_user(db)
     ticket = SupportTicket(user_id=user.id, subject=subject.strip(), status="open")
     db.add(ticket)
     db.flush()
@@ -1638,21 +1763,22 @@ async def create_support_ticket(
     )
     db.add(msg)
     db.flush()
+    msg_attachments: list[SupportAttachment] = []
     for upload in files or []:
         if not upload.filename or upload.filename.strip() == "":
             continue
-        content = await upload.read()
-        if len(content) > support_uploads.MAX_FILE_SIZE_BYTES:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Файл «{upload.filename}» превышает лимит 5 МБ",
-            )
         try:
-            stored_name, size = support_uploads.save_file(
-                content,
+            stored_name, size = await run_in_threadpool(
+                support_uploads.save_stream,
+                upload.file,
                 upload.filename or "file",
                 upload.content_type,
             )
+        except support_uploads.FileTooLargeError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Файл «{upload.filename}» превышает лимит 5 МБ",
+            )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         att = SupportAttachment(
@@ -1663,19 +1789,18 @@ async def create_support_ticket(
             size_bytes=size,
         )
         db.add(att)
+        msg_attachments.append(att)
     db.commit()
     db.refresh(ticket)
     db.refresh(msg)
-    msg_attachments = db.scalars(select(SupportAttachment).where(SupportAttachment.support_message_id == msg.id)).all()
-    _notify_admins_support(
-        db,
+    background.add_task(
+        _notify_admins_support,
         ticket.id,
         user.email,
         user.name,
         ticket.subject,
         message.strip()[:300],
     )
-    created_at = msg.created_at.replace(tzinfo=timezone.utc) if msg.created_at.tzinfo is None else msg.created_at
     return SupportTicketDetailOut(
         id=ticket.id,
         userId=ticket.user_id,
@@ -1683,60 +1808,75 @@ async def create_support_ticket(
         userName=user.name,
         subject=ticket.subject,
         status=ticket.status,
-        createdAt=ticket.created_at.isoformat() if ticket.created_at.tzinfo else ticket.created_at.replace(tzinfo=timezone.utc).isoformat(),
-        updatedAt=ticket.updated_at.isoformat() if ticket.updated_at.tzinfo else ticket.updated_at.replace(tzinfo=timezone.utc).isoformat(),
+        createdAt=_iso_utc(ticket.created_at),
+        updatedAt=_iso_utc(ticket.updated_at),
         messageCount=1,
-        lastMessageAt=created_at.isoformat(),
-        messages=[
-            SupportMessageOut(
-                id=msg.id,
-                ticketId=ticket.id,
-                senderId=msg.sender_id,
-                isFromStaff=msg.is_from_staff,
-                body=msg.body,
-                createdAt=created_at.isoformat(),
-                attachments=[
-                    SupportAttachmentOut(
-                        id=a.id,
-                        supportMessageId=a.support_message_id,
-                        originalFilename=a.original_filename,
-                        contentType=a.content_type,
-                        sizeBytes=a.size_bytes,
-                        createdAt=a.created_at.isoformat() if a.created_at.tzinfo else a.created_at.replace(tzinfo=timezone.utc).isoformat(),
-                    )
-                    for a in msg_attachments
-                ],
-            )
-        ],
+        lastMessageAt=_iso_utc(msg.created_at),
+        messages=[_support_message_to_out(msg, msg_attachments)],
+    )
+
+
+# Данные из БД уже нужных типов — model_construct без повторной валидации каждого поля
+def _support_attachment_to_out(a: SupportAttachment) -> SupportAttachmentOut:
+    return SupportAttachmentOut.model_construct(
+        id=a.id,
+        supportMessageId=a.support_message_id,
+        originalFilename=a.original_filename,
+        contentType=a.content_type,
+        sizeBytes=a.size_bytes,
+        createdAt=_iso_utc(a.created_at),
+    )
+
+
+def _support_message_to_out(m: SupportMessage, attachments: Iterable[SupportAttachment] = ()) -> SupportMessageOut:
+    return SupportMessageOut.model_construct(
+        id=m.id,
+        ticketId=m.ticket_id,
+        senderId=m.sender_id,
+        isFromStaff=m.is_from_staff,
+        body=m.body,
+        createdAt=_iso_utc(m.created_at),
+        attachments=[_support_attachment_to_out(a) for a in attachments],
     )
 
 
 def _support_ticket_to_out(
-    t: SupportTicket, db: Session, include_user: bool = False, for_user_id: int | None = None
+    t: SupportTicket,
+    db: Session,
+    include_user: bool = False,
+    for_user_id: int | None = None,
+    *,
+    user: Any = None,
+    msg_count: int | None = None,
+    last_at: datetime | None = None,
+    has_unread: bool | None = None,
 ) -> SupportTicketOut:
-    user = db.scalar(select(User).where(User.id == t.user_id)) if include_user else None
-    msg_count = db.scalar(select(func.count()).select_from(SupportMessage).where(SupportMessage.ticket_id == t.id)) or 0
-    last_msg = db.scalar(
-        select(SupportMessage).where(SupportMessage.ticket_id == t.id).order_by(desc(SupportMessage.created_at)).limit(1)
-    )
-    last_at = None
-    if last_msg and last_msg.created_at:
-        last_at = last_msg.created_at.isoformat() if last_msg.created_at.tzinfo else last_msg.created_at.replace(tzinfo=timezone.utc).isoformat()
+    """Тикет для API. Списки передают user/msg_count/last_at/has_unread, посчитанные пачкой
+    (_support_tickets_list_out); для одиночного тикета недостающее досчитывается здесь."""
+    if include_user and user is None:
+        user = db.scalar(select(User).where(User.id == t.user_id))
+    if msg_count is None:
+        msg_count = db.scalar(select(func.count(SupportMessage.id)).where(SupportMessage.ticket_id == t.id)) or 0
+        last_msg = db.scalar(
+            select(SupportMessage).where(SupportMessage.ticket_id == t.id).order_by(desc(SupportMessage.created_at)).limit(1)
+        )
+        last_at = last_msg.created_at if last_msg else None
 
-    has_unread = False
-    if for_user_id is not None and t.user_id == for_user_id:
+    if has_unread is None and for_user_id is not None and t.user_id == for_user_id:
         read_at = t.user_last_read_at
-        if read_at is not None and read_at.tzinfo is None:
-            read_at = read_at.replace(tzinfo=timezone.utc)
-        threshold = read_at if read_at else datetime(1970, 1, 1, tzinfo=timezone.utc)
-        has_staff_after = db.scalar(
-            select(func.count()).select_from(SupportMessage).where(
-                SupportMessage.ticket_id == t.id,
-                SupportMessage.is_from_staff.is_(True),
-                SupportMessage.created_at > threshold,
+        threshold = _as_utc(read_at) if read_at else _EPOCH
+        # Нужен только факт наличия ответа — EXISTS останавливается на первой строке, COUNT прошёл бы все
+        has_unread = bool(
+            db.scalar(
+                select(
+                    exists().where(
+                        SupportMessage.ticket_id == t.id,
+                        SupportMessage.is_from_staff.is_(True),
+                        SupportMessage.created_at > threshold,
+                    )
+                )
             )
-        ) or 0
-        has_unread = has_staff_after > 0
+        )
 
     return SupportTicketOut(
         id=t.id,
@@ -1745,12 +1885,58 @@ def _support_ticket_to_out(
         userName=user.name if user else None,
         subject=t.subject,
         status=t.status,
-        createdAt=t.created_at.isoformat() if t.created_at.tzinfo else t.created_at.replace(tzinfo=timezone.utc).isoformat(),
-        updatedAt=t.updated_at.isoformat() if t.updated_at.tzinfo else t.updated_at.replace(tzinfo=timezone.utc).isoformat(),
+        createdAt=_iso_utc(t.created_at),
+        updatedAt=_iso_utc(t.updated_at),
         messageCount=msg_count,
-        lastMessageAt=last_at,
-        hasUnread=has_unread,
+        lastMessageAt=_iso_utc(last_at),
+        hasUnread=bool(has_unread),
+    )
+
+
+def _support_tickets_list_out(
+    db: Session, *where: Any, include_user: bool = False, for_user_id: int | None = None
+) -> list[SupportTicketOut]:
+    """Список тикетов одним запросом: тикет + агрегаты по сообщениям (подзапрос с GROUP BY) + email/имя автора."""
+    msg_q = select(
+        SupportMessage.ticket_id,
+        func.count(SupportMessage.id).label("cnt"),
+        func.max(SupportMessage.created_at).label("last_at"),
+        func.max(case((SupportMessage.is_from_staff.is_(True), SupportMessage.created_at))).label("last_staff_at"),
+    )
+    if where:
+        # Агрегируем только сообщения выбранных тикетов, а не всю support_messages
+        msg_q = msg_q.where(SupportMessage.ticket_id.in_(select(SupportTicket.id).where(*where)))
+    msg_sub = (
+        msg_q.group_by(SupportMessage.ticket_id)
+        .subquery()
     )
+    cols: list[Any] = [SupportTicket, msg_sub.c.cnt, msg_sub.c.last_at, msg_sub.c.last_staff_at]
+    if include_user:
+        cols += [User.email, User.name]
+    stmt = select(*cols).outerjoin(msg_sub, msg_sub.c.ticket_id == SupportTicket.id)
+    if include_user:
+        stmt = stmt.outerjoin(User, User.id == SupportTicket.user_id)
+    stmt = stmt.where(*where).order_by(desc(SupportTicket.updated_at))
+    out: list[SupportTicketOut] = []
+    for row in db.execute(stmt):
+        t = row.SupportTicket
+        has_unread = False
+        if for_user_id is not None and t.user_id == for_user_id and row.last_staff_at is not None:
+            read_at = t.user_last_read_at
+            has_unread = read_at is None or _as_utc(row.last_staff_at) > _as_utc(read_at)
+        out.append(
+            _support_ticket_to_out(
+                t,
+                db,
+                include_user,
+                for_user_id,
+                user=row if include_user else None,  # у строки есть .email/.name — сериализатору этого достаточно
+                msg_count=row.cnt or 0,
+                last_at=row.last_at,
+                has_unread=has_unread,
+            )
+        )
+    return out
 
 
 @app.get("/api/support/tickets", response_model=list[SupportTicketOut])
@@ -1758,9 +1944,7 @@ def list_my_support_tickets(
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> list[SupportTicketOut]:
-    _ensure_default_user(db)
-    rows = db.scalars(select(SupportTicket).where(SupportTicket.user_id == user.id).order_by(desc(SupportTicket.updated_at))).all()
-    return [_support_ticket_to_out(t, db, include_user=False, for_user_id=user.id) for t in rows]
+    return _support_tickets_list_out(db, SupportTicket.user_id == user.id, for_user_id=user.id)
 
 
 @app.get("/api/support/has-any-unread")
@@ -1769,23 +1953,18 @@ def support_has_any_unread(
     db: Session = Depends(get_db),
 ) -> dict[str, bool]:
     """Есть ли у текущего пользователя непрочитанные ответы от поддержки (для индикатора в меню)."""
-    _ensure_default_user(db)
-    rows = db.scalars(select(SupportTicket).where(SupportTicket.user_id == user.id)).all()
-    for t in rows:
-        read_at = t.user_last_read_at
-        if read_at is not None and read_at.tzinfo is None:
-            read_at = read_at.replace(tzinfo=timezone.utc)
-        threshold = read_at if read_at else datetime(1970, 1, 1, tzinfo=timezone.utc)
-        has_staff_after = db.scalar(
-            select(func.count()).select_from(SupportMessage).where(
-                SupportMessage.ticket_id == t.id,
-                SupportMessage.is_from_staff.is_(True),
-                SupportMessage.created_at > threshold,
-            )
-        ) or 0
-        if has_staff_after > 0:
-            return {"hasUnread": True}
-    return {"hasUnread": False}
+    # Один EXISTS вместо COUNT по каждому тикету: БД останавливается на первом найденном ответе
+    threshold = func.coalesce(SupportTicket.user_last_read_at, _EPOCH)
+    stmt = select(
+        exists()
+        .where(
+            SupportTicket.user_id == user.id,
+            SupportMessage.ticket_id == SupportTicket.id,
+            SupportMessage.is_from_staff.is_(True),
+            SupportMessage.created_at > threshold,
+        )
+    )
+    return {"hasUnread": bool(db.scalar(stmt))}
 
 
 @app.get("/api/support/tickets/{ticket_id}", response_model=SupportTicketDetailOut)
@@ -1794,7 +1973,6 @@ def get_support_ticket(
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> SupportTicketDetailOut:
-    _ensure_default_user(db)
     ticket = db.scalar(
         select(SupportTicket)
         .where(SupportTicket.id == ticket_id)
@@ -1805,38 +1983,32 @@ def get_support_ticket(
     if ticket.user_id != user.id and not user.is_admin:
         raise HTTPException(status_code=403, detail="forbidden")
     if ticket.user_id == user.id:
-        ticket.user_last_read_at = _now_utc()
-        db.add(ticket)
-        db.commit()
-        db.refresh(ticket)
-    author = db.scalar(select(User).where(User.id == ticket.user_id))
-    messages_out: list[SupportMessageOut] = []
-    for m in ticket.messages:
-        created = m.created_at.replace(tzinfo=timezone.utc) if m.created_at.tzinfo is None else m.created_at
-        att_out = [
-            SupportAttachmentOut(
-                id=a.id,
-                supportMessageId=a.support_message_id,
-                originalFilename=a.original_filename,
-                contentType=a.content_type,
-                sizeBytes=a.size_bytes,
-                createdAt=a.created_at.isoformat() if a.created_at.tzinfo else a.created_at.replace(tzinfo=timezone.utc).isoformat(),
-            )
-            for a in (m.attachments or [])
-        ]
-        messages_out.append(
-            SupportMessageOut(
-                id=m.id,
-                ticketId=m.ticket_id,
-                senderId=m.sender_id,
-                isFromStaff=m.is_from_staff,
-                body=m.body,
-                createdAt=created.isoformat(),
-                attachments=att_out,
-            )
+        # Один UPDATE ... RETURNING вместо flush + refresh; новое updated_at (onupdate) кладём в загруженный объект
+        read_at = _now_utc()
+        updated_at = db.scalar(
+            update(SupportTicket)
+            .where(SupportTicket.id == ticket.id)
+            .values(user_last_read_at=read_at)
+            .returning(SupportTicket.updated_at),
+            execution_options={"synchronize_session": False},
         )
+        db.commit()
+        set_committed_value(ticket, "user_last_read_at", read_at)
+        set_committed_value(ticket, "updated_at", updated_at)
+    # Свой тикет — автор уже загружен в get_current_user; отдельный SELECT только для админа в чужом тикете
+    author = user if ticket.user_id == user.id else db.scalar(select(User).where(User.id == ticket.user_id))
+    # Сообщения уже загружены selectinload — счётчик и время последнего берём из них, без COUNT/ORDER BY
+    messages = ticket.messages
+    messages_out = [_support_message_to_out(m, m.attachments or ()) for m in messages]
     return SupportTicketDetailOut(
-        **_support_ticket_to_out(ticket, db, include_user=True).model_dump(),
+        **_support_ticket_to_out(
+            ticket,
+            db,
+            include_user=True,
+            user=author,
+            msg_count=len(messages),
+            last_at=max((m.created_at for m in messages), key=_as_utc, default=None),
+        ).model_dump(),
         messages=messages_out,
     )
 
@@ -1844,12 +2016,12 @@ def get_support_ticket(
 @app.post("/api/support/tickets/{ticket_id}/messages", response_model=SupportMessageOut)
 async def add_support_message(
     ticket_id: int,
+    background: BackgroundTasks,
     body: str = Form(..., min_length=1, max_length=10000),
     files: list[UploadFile] = File(default=[]),
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> SupportMessageOut:
-    _ensure_default_user(db)
     ticket = db.scalar(select(SupportTicket).where(SupportTicket.id == ticket_id))
     if not ticket:
         raise HTTPException(status_code=404, detail="ticket not found")
@@ -1868,18 +2040,18 @@ async def add_support_message(
     for upload in files or []:
         if not upload.filename or upload.filename.strip() == "":
             continue
-        content = await upload.read()
-        if len(content) > support_uploads.MAX_FILE_SIZE_BYTES:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Файл «{upload.filename}» превышает лимит 5 МБ",
-            )
         try:
-            stored_name, size = support_uploads.save_file(
-                content,
+            stored_name, size = await run_in_threadpool(
+                support_uploads.save_stream,
+                upload.file,
                 upload.filename or "file",
                 upload.content_type,
             )
+        except support_uploads.FileTooLargeError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Файл «{upload.filename}» превышает лимит 5 МБ",
+            )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         att = SupportAttachment(
@@ -1894,11 +2066,12 @@ async def add_support_message(
         ticket.status = "answered"
     db.add(ticket)
     db.commit()
-    db.refresh(msg)
+    # Один точечный refresh: только время создания и вложения, без перечитывания остальных колонок
+    db.refresh(msg, attribute_names=["created_at", "attachments"])
     if not is_staff:
         author = db.scalar(select(User).where(User.id == ticket.user_id))
-        _notify_admins_support(
-            db,
+        background.add_task(
+            _notify_admins_support,
             ticket.id,
             author.email if author else None,
             author.name if author else None,
@@ -1907,28 +2080,7 @@ async def add_support_message(
         )
     else:
         _notify_user_support_reply(db, ticket, body_clean[:500])
-    created = msg.created_at.replace(tzinfo=timezone.utc) if msg.created_at.tzinfo is None else msg.created_at
-    db.refresh(msg)
-    att_out = [
-        SupportAttachmentOut(
-            id=a.id,
-            supportMessageId=a.support_message_id,
-            originalFilename=a.original_filename,
-            contentType=a.content_type,
-            sizeBytes=a.size_bytes,
-            createdAt=a.created_at.isoformat() if a.created_at.tzinfo else a.created_at.replace(tzinfo=timezone.utc).isoformat(),
-        )
-        for a in (msg.attachments or [])
-    ]
-    return SupportMessageOut(
-        id=msg.id,
-        ticketId=msg.ticket_id,
-        senderId=msg.sender_id,
-        isFromStaff=msg.is_from_staff,
-        body=msg.body,
-        createdAt=created.isoformat(),
-        attachments=att_out,
-    )
+    return _support_message_to_out(msg, msg.attachments or ())
 
 
 @app.get("/api/support/attachments/{attachment_id}")
@@ -1938,7 +2090,6 @@ def download_support_attachment(
     db: Session = Depends(get_db),
 ) -> FileResponse:
     """Скачать вложение (доступ: автор тикета или админ)."""
-    _ensure_default_user(db)
     att = db.scalar(
         select(SupportAttachment).where(SupportAttachment.id == attachment_id).options(selectinload(SupportAttachment.message))
     )
@@ -1952,10 +2103,22 @@ def download_support_attachment(
     path = support_uploads.get_path(att.stored_filename)
     if not path.exists():
         raise HTTPException(status_code=404, detail="file not found")
+    media_type = att.content_type or "application/octet-stream"
+    prefix = support_uploads.ACCEL_REDIRECT_PREFIX
+    if prefix:
+        # Отдачу файла берёт на себя nginx (sendfile), воркер освобождается сразу.
+        # Content-Disposition — так же, как его формирует FileResponse.
+        return Response(
+            media_type=media_type,
+            headers={
+                "X-Accel-Redirect": prefix.rstrip("/") + "/" + att.stored_filename,
+                "Content-Disposition": f"attachment; filename*=utf-8''{quote(att.original_filename)}",
+            },
+        )
     return FileResponse(
         path=str(path),
         filename=att.original_filename,
-        media_type=att.content_type or "application/octet-stream",
+        media_type=media_type,
     )
 
 
@@ -1964,32 +2127,36 @@ def _cleanup_expired_support_attachments() -> None:
     from database import SessionLocal
     cutoff = _now_utc() - timedelta(days=support_uploads.RETENTION_DAYS)
     with SessionLocal() as db:
-        rows = db.scalars(
-            select(SupportAttachment).where(SupportAttachment.created_at < cutoff)
-        ).all()
-        for a in rows:
-            support_uploads.delete_file(a.stored_filename)
-            db.delete(a)
+        # Один DELETE на всю выборку; файлы удаляем уже после коммита, вне транзакции
+        expired = SupportAttachment.created_at < cutoff
+        if db.get_bind().dialect.delete_returning:
+            names = db.scalars(delete(SupportAttachment).where(expired).returning(SupportAttachment.stored_filename)).all()
+        else:
+            names = db.scalars(select(SupportAttachment.stored_filename).where(expired)).all()
+            db.execute(delete(SupportAttachment).where(expired))
         db.commit()
+    for name in names:
+        support_uploads.delete_file(name)
 
 
 @app.patch("/api/support/tickets/{ticket_id}", response_model=SupportTicketOut)
 def update_support_ticket_status(
     ticket_id: int,
     body: SupportTicketStatusUpdate,
-    user: User = Depends(get_current_user),
+    _: User = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ) -> SupportTicketOut:
-    _ensure_default_user(db)
-    if not user.is_admin:
-        raise HTTPException(status_code=403, detail="Admin only")
-    ticket = db.scalar(select(SupportTicket).where(SupportTicket.id == ticket_id))
+    # UPDATE ... RETURNING сразу отдаёт обновлённый тикет: без предварительного SELECT и refresh
+    ticket = db.scalar(
+        update(SupportTicket)
+        .where(SupportTicket.id == ticket_id)
+        .values(status=body.status)
+        .returning(SupportTicket),
+        execution_options={"synchronize_session": False},
+    )
     if not ticket:
         raise HTTPException(status_code=404, detail="ticket not found")
-    ticket.status = body.status
-    db.add(ticket)
     db.commit()
-    db.refresh(ticket)
     return _support_ticket_to_out(ticket, db, include_user=True)
 
 
@@ -1998,20 +2165,16 @@ def list_all_support_tickets(
     _: User = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ) -> list[SupportTicketOut]:
-    _ensure_default_user(db)
-    rows = db.scalars(select(SupportTicket).order_by(desc(SupportTicket.updated_at))).all()
-    return [_support_ticket_to_out(t, db, include_user=True) for t in rows]
+    return _support_tickets_list_out(db, include_user=True)
 
 
 @app.get("/api/keywords", response_model=list[KeywordOut])
 def list_keywords(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> list[KeywordOut]:
-    _ensure_default_user(db)
     return _keywords_out_by_user_id(db, user.id)
 
 
 @app.post("/api/keywords", response_model=KeywordOut)
 def create_keyword(body: KeywordCreate, user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> KeywordOut:
-    _ensure_default_user(db)
     user_id = user.id
     _check_plan_can_track(user)
     use_semantic = getattr(body, "useSemantic", False)
@@ -2027,7 +2190,11 @@ def create_keyword(body: KeywordCreate, user: User = Depends(get_current_user),
         raise HTTPException(status_code=400, detail="text is required")
 
     # Не дублируем по (user_id, text); при наличии отключённого — включаем (восстановление)
-    existing = db.scalar(select(Keyword).where(Keyword.user_id == user_id, Keyword.text == text))
+    existing = db.scalar(
+        select(Keyword)
+        .where(Keyword.user_id == user_id, Keyword.text == text)
+        .options(selectinload(Keyword.exclusion_words), raiseload("*"))
+    )
     if existing:
         if not getattr(existing, "enabled", True):
             _check_limits(
@@ -2038,40 +2205,21 @@ def create_keyword(body: KeywordCreate, user: User = Depends(get_current_user),
             )
             existing.enabled = True
             db.commit()
-            db.refresh(existing)
-        created_at = existing.created_at
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
-        excl_list: list[ExclusionWordOut] = []
-        for e in db.scalars(select(ExclusionWord).where(ExclusionWord.keyword_id == existing.id)).all():
-            ct = e.created_at
-            if ct.tzinfo is None:
-                ct = ct.replace(tzinfo=timezone.utc)
-            excl_list.append(ExclusionWordOut(id=e.id, text=e.text, createdAt=ct.isoformat()))
-        return KeywordOut(
-            id=existing.id,
-            text=existing.text,
-            useSemantic=getattr(existing, "use_semantic", False),
-            userId=existing.user_id,
-            createdAt=created_at.isoformat(),
-            enabled=getattr(existing, "enabled", True),
-            exclusionWords=excl_list,
-        )
+            _invalidate_plan_cache(user_id)
+        return _keyword_to_out(existing)
 
     use_semantic = getattr(body, "useSemantic", False)
     k = Keyword(user_id=user_id, text=text, use_semantic=use_semantic, enabled=True)
     db.add(k)
     db.commit()
+    _invalidate_plan_cache(user_id)
     db.refresh(k)
-    created_at = k.created_at
-    if created_at.tzinfo is None:
-        created_at = created_at.replace(tzinfo=timezone.utc)
     return KeywordOut(
         id=k.id,
         text=k.text,
         useSemantic=k.use_semantic,
         userId=k.user_id,
-        createdAt=created_at.isoformat(),
+        createdAt=_iso_utc(k.created_at),
         enabled=True,
         exclusionWords=[],
     )
@@ -2099,35 +2247,21 @@ def delete_keyword(
     else:
         k.enabled = False
     db.commit()
+    _invalidate_plan_cache(user.id)
     return {"ok": True}
 
 
 @app.patch("/api/keywords/{keyword_id}/restore", response_model=KeywordOut)
 def restore_keyword(keyword_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> KeywordOut:
-    k = db.scalar(select(Keyword).where(Keyword.id == keyword_id))
+    k = db.scalar(
+        select(Keyword).where(Keyword.id == keyword_id).options(selectinload(Keyword.exclusion_words), raiseload("*"))
+    )
     if not k:
         raise HTTPException(status_code=404, detail="keyword not found")
     if k.user_id != user.id:
         raise HTTPException(status_code=403, detail="forbidden")
     if getattr(k, "enabled", True):
-        created_at = k.created_at
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
-        excl_list = []
-        for e in db.scalars(select(ExclusionWord).where(ExclusionWord.keyword_id == k.id)).all():
-            ct = e.created_at
-            if ct.tzinfo is None:
-                ct = ct.replace(tzinfo=timezone.utc)
-            excl_list.append(ExclusionWordOut(id=e.id, text=e.text, createdAt=ct.isoformat()))
-        return KeywordOut(
-            id=k.id,
-            text=k.text,
-            useSemantic=getattr(k, "use_semantic", False),
-            userId=k.user_id,
-            createdAt=created_at.isoformat(),
-            enabled=True,
-            exclusionWords=excl_list,
-        )
+        return _keyword_to_out(k)
     _check_limits(
         db,
         user,
@@ -2136,25 +2270,9 @@ def restore_keyword(keyword_id: int, user: User = Depends(get_current_user), db:
     )
     k.enabled = True
     db.commit()
-    db.refresh(k)
-    created_at = k.created_at
-    if created_at.tzinfo is None:
-        created_at = created_at.replace(tzinfo=timezone.utc)
-    excl_list = []
-    for e in db.scalars(select(ExclusionWord).where(ExclusionWord.keyword_id == k.id)).all():
-        ct = e.created_at
-        if ct.tzinfo is None:
-            ct = ct.replace(tzinfo=timezone.utc)
-        excl_list.append(ExclusionWordOut(id=e.id, text=e.text, createdAt=ct.isoformat()))
-    return KeywordOut(
-        id=k.id,
-        text=k.text,
-        useSemantic=k.use_semantic,
-        userId=k.user_id,
-        createdAt=created_at.isoformat(),
-        enabled=True,
-        exclusionWords=excl_list,
-    )
+    _invalidate_plan_cache(user.id)
+    # expire_on_commit=False: exclusion_words остаются загруженными, refresh не нужен
+    return _keyword_to_out(k)
 
 
 # --- Слова-исключения (уникальные для каждого ключевого слова) ---
@@ -2166,24 +2284,12 @@ def list_keyword_exclusion_words(
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> list[ExclusionWordOut]:
-    _ensure_default_user(db)
-    k = db.scalar(select(Keyword).where(Keyword.id == keyword_id))
+    k = db.scalar(
+        select(Keyword).where(Keyword.id == keyword_id).options(selectinload(Keyword.exclusion_words), raiseload("*"))
+    )
     if not k or k.user_id != user.id:
         raise HTTPException(status_code=404, detail="keyword not found")
-    rows = (
-        db.scalars(
-            select(ExclusionWord)
-            .where(ExclusionWord.keyword_id == keyword_id)
-            .order_by(ExclusionWord.id.asc())
-        )
-    ).all()
-    out: list[ExclusionWordOut] = []
-    for w in rows:
-        created_at = w.created_at
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
-        out.append(ExclusionWordOut(id=w.id, text=w.text, createdAt=created_at.isoformat()))
-    return out
+    return [_exclusion_word_to_out(w) for w in k.exclusion_words]
 
 
 @app.post("/api/keywords/{keyword_id}/exclusion-words", response_model=ExclusionWordOut)
@@ -2193,7 +2299,6 @@ def create_keyword_exclusion_word(
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> ExclusionWordOut:
-    _ensure_default_user(db)
     k = db.scalar(select(Keyword).where(Keyword.id == keyword_id))
     if not k or k.user_id != user.id:
         raise HTTPException(status_code=404, detail="keyword not found")
@@ -2204,18 +2309,12 @@ def create_keyword_exclusion_word(
         select(ExclusionWord).where(ExclusionWord.keyword_id == keyword_id, ExclusionWord.text == text)
     )
     if existing:
-        created_at = existing.created_at
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
-        return ExclusionWordOut(id=existing.id, text=existing.text, createdAt=created_at.isoformat())
+        return _exclusion_word_to_out(existing)
     w = ExclusionWord(keyword_id=keyword_id, text=text)
     db.add(w)
     db.commit()
     db.refresh(w)
-    created_at = w.created_at
-    if created_at.tzinfo is None:
-        created_at = created_at.replace(tzinfo=timezone.utc)
-    return ExclusionWordOut(id=w.id, text=w.text, createdAt=created_at.isoformat())
+    return _exclusion_word_to_out(w)
 
 
 @app.delete("/api/exclusion-words/{word_id}")
@@ -2232,6 +2331,17 @@ def delete_exclusion_word(word_id: int, user: User = Depends(get_current_user),
     return {"ok": True}
 
 
+# Ссылка t.me/... | telegram.me/...: после префикса — [s/]c/ID, [s/]joinchat/HASH, [s/]+HASH или [s/]username.
+# Сегменты ограничены "/" и "?"; s/ и joinchat/ считаются префиксами, только если за ними что-то есть.
+_TG_LINK_RE = re.compile(
+    r"(?:t|telegram)\.me/(?:s/+(?=[^/?]))?"
+    r"(?:c/(?P<cid>-?[0-9]+)(?=[/?]|$)"
+    r"|(?:joinchat/(?=/*[^/?])|\+)(?P<invite>[^/?]*)"
+    r"|(?P<uname>[^/?]*))"
+)
+
+
+@lru_cache(maxsize=4096)
 def _parse_chat_identifier(ident: str) -> tuple[str | None, int | None, str | None]:
     """
     Парсит идентификатор: ссылку (t.me/...), @username или chat_id.
@@ -2242,33 +2352,18 @@ def _parse_chat_identifier(ident: str) -> tuple[str | None, int | None, str | No
         return (None, None, None)
     # Ссылка t.me/...
     if "t.me/" in raw or "telegram.me/" in raw:
-        s = raw.replace("https://", "").replace("http://", "").strip()
-        for prefix in ("t.me/", "telegram.me/"):
-            if prefix in s:
-                part = s.split(prefix, 1)[-1].split("?")[0].rstrip("/")
-                if not part:
-                    break
-                # t.me/s/username[/123] -> username
-                if part.startswith("s/"):
-                    part = part[2:].lstrip("/")
-                # t.me/c/1234567890[/123] -> -1001234567890
-                if part.startswith("c/"):
-                    c_parts = part.split("/")
-                    if len(c_parts) >= 2 and c_parts[1].lstrip("-").isdigit():
-                        return (None, -1000000000000 - int(c_parts[1]), None)
-                # t.me/joinchat/HASH[/...] или t.me/+HASH[/...]
-                if part.startswith("joinchat/"):
-                    invite_part = part[9:].strip()
-                    invite_hash = invite_part.split("/", 1)[0].strip()
-                    return (None, None, invite_hash or None)
-                if part.startswith("+"):
-                    invite_part = part[1:].strip()
-                    invite_hash = invite_part.split("/", 1)[0].strip()
-                    return (None, None, invite_hash or None)
-                # t.me/username[/123]
-                username = part.split("/", 1)[0].strip().lstrip("@")
-                return (username or None, None, None)
-        return (None, None, None)
+        m = _TG_LINK_RE.search(raw.replace("https://", "").replace("http://", ""))
+        if m is None:
+            return (None, None, None)
+        cid = m.group("cid")
+        if cid is not None:
+            # t.me/c/1234567890[/123] -> -1001234567890
+            return (None, -1000000000000 - int(cid), None)
+        invite = m.group("invite")
+        if invite is not None:
+            return (None, None, invite.strip() or None)
+        # t.me/username[/123]
+        return (m.group("uname").strip().lstrip("@") or None, None, None)
     # Числовой chat_id
     if raw.lstrip("-").isdigit():
         return (None, int(raw), None)
@@ -2330,7 +2425,39 @@ def _proxy_tuple_from_settings() -> tuple | None:
     )
 
 
-async def _resolve_telegram_channel_bundle_meta_async(identifier: str) -> dict[str, Any] | None:
+# Сервисный TG-клиент для разовых RPC из API (вступление в канал, метаданные бандла). Держим одно подключение
+# на основном loop вместо connect()/disconnect() (TCP + MTProto handshake) на каждый запрос; пинги и
+# переподключение при обрыве Telethon делает сам.
+_tg_client: TelegramClient | None = None
+_tg_client_key: tuple | None = None
+_tg_client_lock: asyncio.Lock | None = None
+
+
+def _session_string_from_file(session_name: str) -> str:
+    """Авторизация из файловой сессии парсера (.session) в виде строки StringSession; пусто, если её нет.
+    Файл открываем только на чтение: им же пользуется клиент сканера (parser.py), писать в него второй клиент не должен."""
+    path = session_name if session_name.endswith(".session") else session_name + ".session"
+    if not os.path.exists(path):
+        return ""
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT dc_id, server_address, port, auth_key FROM sessions").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return ""
+    if not row or not row[3]:
+        return ""
+    session = StringSession()
+    session.set_dc(row[0], row[1], row[2])
+    session.auth_key = AuthKey(data=row[3])
+    return session.save()
+
+
+def _tg_client_settings() -> tuple | None:
+    """(api_id, api_hash, session_string, proxy) из настроек парсера или None, если TG не настроен.
+    Сервисный клиент всегда работает на StringSession: для файловой сессии копируем из неё авторизацию."""
     api_id = get_parser_setting_str("TG_API_ID")
     api_hash = get_parser_setting_str("TG_API_HASH")
     if not api_id or not api_hash:
@@ -2339,131 +2466,180 @@ async def _resolve_telegram_channel_bundle_meta_async(identifier: str) -> dict[s
         api_id_int = int(api_id)
     except ValueError:
         return None
-
     session_string = get_parser_setting_str("TG_SESSION_STRING")
-    session_name = get_parser_setting_str("TG_SESSION_NAME") or "telegram_monitor"
-    proxy = _proxy_tuple_from_settings()
-    client = TelegramClient(StringSession(session_string), api_id_int, api_hash, proxy=proxy) if session_string else TelegramClient(session_name, api_id_int, api_hash, proxy=proxy)
+    if not session_string:
+        session_string = _session_string_from_file(get_parser_setting_str("TG_SESSION_NAME") or "telegram_monitor")
+        if not session_string:
+            return None
+    return (api_id_int, api_hash, session_string, _proxy_tuple_from_settings())
+
+
+def _new_tg_client(settings: tuple) -> TelegramClient:
+    api_id_int, api_hash, session_string, proxy = settings
+    # Только RPC: апдейты получает клиент сканера с той же авторизацией, второй поток апдейтов ему бы мешал
+    return TelegramClient(StringSession(session_string), api_id_int, api_hash, proxy=proxy, receive_updates=False)
+
 
+async def _disconnect_tg_client_quietly(client: TelegramClient) -> None:
     try:
-        await client.connect()
-        if not await client.is_user_authorized():
-            return None
-        entity = await client.get_entity(identifier)
-        full = await client(GetFullChannelRequest(entity))
-        full_chat = getattr(full, "full_chat", None)
-        linked_chat_id = _normalize_telethon_chat_id(getattr(full_chat, "linked_chat_id", None))
-        linked_entity = None
-        if linked_chat_id is not None and getattr(full, "chats", None):
-            for ch_obj in (full.chats or []):
-                if _normalize_telethon_chat_id(getattr(ch_obj, "id", None)) == linked_chat_id:
-                    linked_entity = ch_obj
-                    break
-        if linked_entity is None and linked_chat_id is not None:
-            try:
-                linked_entity = await client.get_entity(PeerChannel(abs(linked_chat_id) % (10**10)))
-            except Exception:
-                linked_entity = None
-        if linked_entity is not None:
-            try:
-                await client(JoinChannelRequest(linked_entity))
-            except UserAlreadyParticipantError:
-                pass
-            except InviteRequestSentError:
-                pass
-            except FloodWaitError as e:
-                try:
-                    await asyncio.sleep(max(1, int(getattr(e, "seconds", 1))))
-                    await client(JoinChannelRequest(linked_entity))
-                except Exception:
-                    pass
-            except Exception:
-                pass
-        elif linked_chat_id is not None:
-            try:
-                await client(JoinChannelRequest(PeerChannel(abs(linked_chat_id) % (10**10))))
-            except Exception:
-                pass
-        return {
-            "channel_tg_chat_id": _normalize_telethon_chat_id(getattr(entity, "id", None)),
-            "channel_username": getattr(entity, "username", None),
-            "channel_title": getattr(entity, "title", None) or getattr(entity, "name", None),
-            "channel_description": getattr(full_chat, "about", None),
-            "linked_tg_chat_id": linked_chat_id,
-            "linked_username": getattr(linked_entity, "username", None) if linked_entity is not None else None,
-            "linked_title": (
-                (getattr(linked_entity, "title", None) or getattr(linked_entity, "name", None))
-                if linked_entity is not None
-                else None
-            ),
-        }
+        await client.disconnect()
     except Exception:
-        return None
+        pass
+
+
+async def _get_cached_tg_client(settings: tuple) -> TelegramClient:
+    """Клиент из кэша (пересоздаётся при смене настроек), подключённый. Вызывать только на main_loop."""
+    global _tg_client, _tg_client_key, _tg_client_lock
+    if _tg_client_lock is None:
+        _tg_client_lock = asyncio.Lock()
+    async with _tg_client_lock:
+        if _tg_client is not None and _tg_client_key != settings:
+            await _disconnect_tg_client_quietly(_tg_client)
+            _tg_client = None
+        if _tg_client is None:
+            _tg_client = _new_tg_client(settings)
+            _tg_client_key = settings
+        if not _tg_client.is_connected():
+            await _tg_client.connect()
+        return _tg_client
+
+
+@asynccontextmanager
+async def _tg_rpc_client(settings: tuple | None):
+    """Авторизованный клиент для RPC или None. На main_loop — общий кэшированный, иначе (скрипты) — одноразовый.
+    settings (_tg_client_settings) читает вызывающий код в своём потоке — из event loop в БД не ходим."""
+    if settings is None:
+        yield None
+        return
+    if main_loop is not None and asyncio.get_running_loop() is main_loop:
+        client = await _get_cached_tg_client(settings)
+        yield client if await client.is_user_authorized() else None
+        return
+    client = _new_tg_client(settings)
+    try:
+        await client.connect()
+        yield client if await client.is_user_authorized() else None
     finally:
+        await _disconnect_tg_client_quietly(client)
+
+
+def _run_tg_rpc(coro_factory: Callable[[], Awaitable[Any]], timeout: float | None = 120.0) -> Any:
+    """Выполнить TG-корутину из синхронного кода (эндпоинт в threadpool) на основном loop, где живёт общий клиент."""
+    loop = main_loop
+    if loop is not None and loop.is_running():
         try:
-            await client.disconnect()
-        except Exception:
-            pass
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not loop:
+            return asyncio.run_coroutine_threadsafe(coro_factory(), loop).result(timeout)
+    return asyncio.run(coro_factory())
 
 
-async def _ensure_telegram_membership_async(identifier: str) -> bool:
-    """Best-effort: попытка вступить в канал/чат по username|id|entity через сервисный TG-аккаунт."""
-    api_id = get_parser_setting_str("TG_API_ID")
-    api_hash = get_parser_setting_str("TG_API_HASH")
-    if not api_id or not api_hash:
-        return False
+async def _resolve_telegram_channel_bundle_meta_async(identifier: str, settings: tuple | None) -> dict[str, Any] | None:
     try:
-        api_id_int = int(api_id)
-    except ValueError:
-        return False
+        async with _tg_rpc_client(settings) as client:
+            if client is None:
+                return None
+            return await _fetch_telegram_channel_bundle_meta(client, identifier)
+    except Exception:
+        return None
 
-    session_string = get_parser_setting_str("TG_SESSION_STRING")
-    session_name = get_parser_setting_str("TG_SESSION_NAME") or "telegram_monitor"
-    proxy = _proxy_tuple_from_settings()
-    client = TelegramClient(StringSession(session_string), api_id_int, api_hash, proxy=proxy) if session_string else TelegramClient(session_name, api_id_int, api_hash, proxy=proxy)
 
-    try:
-        await client.connect()
-        if not await client.is_user_authorized():
-            return False
-        entity = await client.get_entity(identifier)
+async def _fetch_telegram_channel_bundle_meta(client: TelegramClient, identifier: str) -> dict[str, Any]:
+    entity = await client.get_entity(identifier)
+    full = await client(GetFullChannelRequest(entity))
+    full_chat = getattr(full, "full_chat", None)
+    linked_chat_id = _normalize_telethon_chat_id(getattr(full_chat, "linked_chat_id", None))
+    linked_entity = None
+    if linked_chat_id is not None and getattr(full, "chats", None):
+        for ch_obj in (full.chats or []):
+            if _normalize_telethon_chat_id(getattr(ch_obj, "id", None)) == linked_chat_id:
+                linked_entity = ch_obj
+                break
+    if linked_entity is None and linked_chat_id is not None:
         try:
-            await client(JoinChannelRequest(entity))
-            return True
+            linked_entity = await client.get_entity(PeerChannel(abs(linked_chat_id) % (10**10)))
+        except Exception:
+            linked_entity = None
+    if linked_entity is not None:
+        try:
+            await client(JoinChannelRequest(linked_entity))
         except UserAlreadyParticipantError:
-            return True
+            pass
+        except InviteRequestSentError:
+            pass
+        except FloodWaitError as e:
+            try:
+                await asyncio.sleep(max(1, int(getattr(e, "seconds", 1))))
+                await client(JoinChannelRequest(linked_entity))
+            except Exception:
+                pass
         except Exception:
-            return False
-    except Exception:
-        return False
-    finally:
+            pass
+    elif linked_chat_id is not None:
         try:
-            await client.disconnect()
+            await client(JoinChannelRequest(PeerChannel(abs(linked_chat_id) % (10**10))))
         except Exception:
             pass
+    return {
+        "channel_tg_chat_id": _normalize_telethon_chat_id(getattr(entity, "id", None)),
+        "channel_username": getattr(entity, "username", None),
+        "channel_title": getattr(entity, "title", None) or getattr(entity, "name", None),
+        "channel_description": getattr(full_chat, "about", None),
+        "linked_tg_chat_id": linked_chat_id,
+        "linked_username": getattr(linked_entity, "username", None) if linked_entity is not None else None,
+        "linked_title": (
+            (getattr(linked_entity, "title", None) or getattr(linked_entity, "name", None))
+            if linked_entity is not None
+            else None
+        ),
+    }
+
+
+async def _ensure_telegram_membership_async(identifier: str, settings: tuple | None) -> bool:
+    """Best-effort: попытка вступить в канал/чат по username|id|entity через сервисный TG-аккаунт."""
+    try:
+        async with _tg_rpc_client(settings) as client:
+            if client is None:
+                return False
+            entity = await client.get_entity(identifier)
+            try:
+                await client(JoinChannelRequest(entity))
+                return True
+            except UserAlreadyParticipantError:
+                return True
+            except Exception:
+                return False
+    except Exception:
+        return False
 
 
 def _ensure_telegram_membership(identifier: str) -> bool:
     try:
-        return asyncio.run(_ensure_telegram_membership_async(identifier))
+        # Настройки читаем здесь (threadpool), а не в корутине на main_loop
+        settings = _tg_client_settings()
+        return _run_tg_rpc(lambda: _ensure_telegram_membership_async(identifier, settings))
     except Exception:
         return False
 
 
 def _resolve_telegram_channel_bundle_meta(identifier: str) -> dict[str, Any] | None:
     try:
-        return asyncio.run(_resolve_telegram_channel_bundle_meta_async(identifier))
+        settings = _tg_client_settings()
+        return _run_tg_rpc(lambda: _resolve_telegram_channel_bundle_meta_async(identifier, settings))
     except Exception:
         return None
 
 
 def _bundle_global_chats(db: Session, base_chat: Chat) -> list[Chat]:
-    if not bool(getattr(base_chat, "is_global", False)):
+    # Колонки is_global/source/billing_key есть всегда (миграции) — прямой доступ вместо getattr;
+    # самый частый случай (не глобальный чат) отсекается первым.
+    if not base_chat.is_global:
         return [base_chat]
-    source = getattr(base_chat, "source", None) or CHAT_SOURCE_TELEGRAM
-    if source != CHAT_SOURCE_TELEGRAM:
+    if (base_chat.source or CHAT_SOURCE_TELEGRAM) != CHAT_SOURCE_TELEGRAM:
         return [base_chat]
-    billing_key = getattr(base_chat, "billing_key", None)
+    billing_key = base_chat.billing_key
     if not billing_key:
         return [base_chat]
     rows = db.scalars(
@@ -2480,39 +2656,45 @@ def _bundle_needs_individual_limit(db: Session, user_id: int, chats: list[Chat])
     chat_ids = [c.id for c in chats]
     if not chat_ids:
         return False
-    exists_individual = db.execute(
-        select(user_chat_subscriptions).where(
-            user_chat_subscriptions.c.user_id == user_id,
-            user_chat_subscriptions.c.chat_id.in_(chat_ids),
-            user_chat_subscriptions.c.via_group_id.is_(None),
+    # Лимит нужен, только если ни на один чат бандла ещё нет индивидуальной подписки
+    has_individual = db.scalar(
+        select(
+            exists().where(
+                user_chat_subscriptions.c.user_id == user_id,
+                user_chat_subscriptions.c.chat_id.in_(chat_ids),
+                user_chat_subscriptions.c.via_group_id.is_(None),
+            )
         )
-    ).first()
-    return exists_individual is None
+    )
+    return not has_individual
+
+
+def _subscriptions_insert(db: Session) -> Any:
+    """INSERT в user_chat_subscriptions с поддержкой ON CONFLICT для диалекта текущей БД."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise RuntimeError(f"unsupported dialect for subscriptions upsert: {dialect}")
+    return dialect_insert(user_chat_subscriptions)
 
 
 def _upsert_individual_subscriptions(db: Session, user_id: int, chats: list[Chat]) -> None:
-    for chat in chats:
-        existing = db.execute(
-            select(user_chat_subscriptions).where(
-                user_chat_subscriptions.c.user_id == user_id,
-                user_chat_subscriptions.c.chat_id == chat.id,
-            )
-        ).first()
-        if existing:
-            db.execute(
-                update(user_chat_subscriptions)
-                .where(
-                    user_chat_subscriptions.c.user_id == user_id,
-                    user_chat_subscriptions.c.chat_id == chat.id,
-                )
-                .values(via_group_id=None, enabled=True)
-            )
-        else:
-            db.execute(
-                user_chat_subscriptions.insert().values(
-                    user_id=user_id, chat_id=chat.id, via_group_id=None, enabled=True
-                )
-            )
+    """Индивидуальная подписка на все чаты бандла одним INSERT ... ON CONFLICT DO UPDATE."""
+    chat_ids = list(dict.fromkeys(c.id for c in chats))  # ON CONFLICT не может дважды обновить одну строку
+    if not chat_ids:
+        return
+    stmt = _subscriptions_insert(db).values(
+        [{"user_id": user_id, "chat_id": cid, "via_group_id": None, "enabled": True} for cid in chat_ids]
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[user_chat_subscriptions.c.user_id, user_chat_subscriptions.c.chat_id],
+            set_={"via_group_id": None, "enabled": True},
+        )
+    )
 
 
 def _upsert_linked_chat_for_channel(
@@ -2525,22 +2707,10 @@ def _upsert_linked_chat_for_channel(
     billing_key: str | None,
 ) -> bool:
     """Создать/обновить linked discussion-чат для канала. Возвращает True, если были изменения."""
-    def _row_get(row: Any, column_name: str, fallback_index: int, default: Any = None) -> Any:
-        mapping = getattr(row, "_mapping", None)
-        if mapping is not None:
-            if column_name in mapping:
-                return mapping[column_name]
-            for k in mapping.keys():
-                if str(k).endswith(f".{column_name}") or str(k) == column_name:
-                    return mapping[k]
-        try:
-            return row[fallback_index]
-        except Exception:
-            return default
-
     changed = False
+    # groups читаются ниже при слиянии групп канала — грузим сразу, без отдельного lazy SELECT
     linked = db.scalar(
-        select(Chat).where(
+        select(Chat).options(selectinload(Chat.groups)).where(
             Chat.user_id == channel_chat.user_id,
             Chat.source == CHAT_SOURCE_TELEGRAM,
             Chat.tg_chat_id == linked_tg_chat_id,
@@ -2548,7 +2718,7 @@ def _upsert_linked_chat_for_channel(
     )
     if linked is None and linked_username:
         linked = db.scalar(
-            select(Chat).where(
+            select(Chat).options(selectinload(Chat.groups)).where(
                 Chat.user_id == channel_chat.user_id,
                 Chat.source == CHAT_SOURCE_TELEGRAM,
                 Chat.username == linked_username,
@@ -2573,14 +2743,17 @@ def _upsert_linked_chat_for_channel(
         db.add(linked)
         changed = True
     else:
-        if billing_key and getattr(linked, "billing_key", None) != billing_key:
-            linked.billing_key = billing_key
-            changed = True
-        if linked_username and (getattr(linked, "username", None) or "").strip() != linked_username:
-            linked.username = linked_username
-            changed = True
-        if linked_title and (getattr(linked, "title", None) or "").strip() != linked_title:
-            linked.title = linked_title
+        # Обновляем только непустые свежие значения, которые отличаются от текущих (username/title — без пробелов по краям)
+        updates: dict[str, Any] = {}
+        if billing_key and linked.billing_key != billing_key:
+            updates["billing_key"] = billing_key
+        if linked_username and (linked.username or "").strip() != linked_username:
+            updates["username"] = linked_username
+        if linked_title and (linked.title or "").strip() != linked_title:
+            updates["title"] = linked_title
+        if updates:
+            for k, v in updates.items():
+                setattr(linked, k, v)
             changed = True
         if bool(channel_chat.is_global) and not bool(linked.is_global):
             linked.is_global = True
@@ -2593,78 +2766,33 @@ def _upsert_linked_chat_for_channel(
                     changed = True
         db.add(linked)
 
-    db.flush()
-    if bool(channel_chat.is_global):
-        try:
-            sub_rows = db.execute(
-                select(
-                    user_chat_subscriptions.c.user_id,
-                    user_chat_subscriptions.c.via_group_id,
-                    user_chat_subscriptions.c.enabled,
-                ).where(user_chat_subscriptions.c.chat_id == channel_chat.id)
-            ).all()
-        except Exception:
-            # Совместимость со старыми БД до миграции колонки enabled.
-            sub_rows_raw = db.execute(
-                select(
-                    user_chat_subscriptions.c.user_id,
-                    user_chat_subscriptions.c.via_group_id,
-                ).where(user_chat_subscriptions.c.chat_id == channel_chat.id)
-            ).all()
-            sub_rows = [(uid, via_group_id, True) for uid, via_group_id in sub_rows_raw]
-        for uid, via_group_id, sub_enabled in sub_rows:
-            existing = db.execute(
-                select(user_chat_subscriptions).where(
-                    user_chat_subscriptions.c.user_id == uid,
-                    user_chat_subscriptions.c.chat_id == linked.id,
-                )
-            ).first()
-            if existing is None:
-                try:
-                    db.execute(
-                        user_chat_subscriptions.insert().values(
-                            user_id=uid,
-                            chat_id=linked.id,
-                            via_group_id=via_group_id,
-                            enabled=True if sub_enabled is None else bool(sub_enabled),
-                        )
-                    )
-                except Exception:
-                    db.execute(
-                        user_chat_subscriptions.insert().values(
-                            user_id=uid,
-                            chat_id=linked.id,
-                            via_group_id=via_group_id,
-                        )
-                    )
-                changed = True
-                continue
-            existing_via = _row_get(existing, "via_group_id", 2, None)
-            merged_via = None if (existing_via is None or via_group_id is None) else existing_via
-            try:
-                existing_enabled = _row_get(existing, "enabled", 3, True)
-                merged_enabled = bool(existing_enabled) or bool(sub_enabled)
-                if existing_via != merged_via or bool(existing_enabled) != merged_enabled:
-                    db.execute(
-                        update(user_chat_subscriptions)
-                        .where(
-                            user_chat_subscriptions.c.user_id == uid,
-                            user_chat_subscriptions.c.chat_id == linked.id,
-                        )
-                        .values(via_group_id=merged_via, enabled=merged_enabled)
-                    )
-                    changed = True
-            except Exception:
-                if existing_via != merged_via:
-                    db.execute(
-                        update(user_chat_subscriptions)
-                        .where(
-                            user_chat_subscriptions.c.user_id == uid,
-                            user_chat_subscriptions.c.chat_id == linked.id,
-                        )
-                        .values(via_group_id=merged_via)
-                    )
-                    changed = True
+    if not bool(channel_chat.is_global):
+        # Подписки копируются только для глобальных каналов; flush сделает вызывающий код
+        return changed
+    db.flush()  # нужен linked.id для новой строки
+    # Копируем подписки канала одним INSERT ... SELECT ... ON CONFLICT, без выборки строк в Python:
+    # при конфликте подписка становится индивидуальной, если хоть одна из двух индивидуальная,
+    # и включённой, если хоть одна включена. WHERE пропускает строки без изменений,
+    # поэтому RETURNING отдаёт только вставленные/обновлённые.
+    cur = user_chat_subscriptions.c
+    stmt = _subscriptions_insert(db).from_select(
+        ["user_id", "chat_id", "via_group_id", "enabled"],
+        select(cur.user_id, literal(linked.id), cur.via_group_id, cur.enabled).where(cur.chat_id == channel_chat.id),
+    )
+    becomes_individual = and_(cur.via_group_id.is_not(None), stmt.excluded.via_group_id.is_(None))
+    becomes_enabled = and_(not_(cur.enabled), stmt.excluded.enabled)
+    touched = db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[cur.user_id, cur.chat_id],
+            set_={
+                "via_group_id": case((stmt.excluded.via_group_id.is_(None), None), else_=cur.via_group_id),
+                "enabled": or_(cur.enabled, stmt.excluded.enabled),
+            },
+            where=or_(becomes_individual, becomes_enabled),
+        ).returning(cur.user_id)
+    ).first()
+    if touched is not None:
+        changed = True
     return changed
 
 
@@ -2684,22 +2812,13 @@ def _backfill_telegram_linked_chats_once(*, force: bool = False) -> dict[str, An
             "detail": "Backfill уже был выполнен ранее.",
         }
 
-    async def _collect_linked_meta_batch(chats: list[Chat]) -> tuple[int, dict[int, dict[str, Any]], dict[str, Any]]:
-        api_id = get_parser_setting_str("TG_API_ID")
-        api_hash = get_parser_setting_str("TG_API_HASH")
-        if not api_id or not api_hash:
-            return (0, {})
-        try:
-            api_id_int = int(api_id)
-        except ValueError:
-            return (0, {})
-
-        session_string = get_parser_setting_str("TG_SESSION_STRING")
-        session_name = get_parser_setting_str("TG_SESSION_NAME") or "telegram_monitor"
-        proxy = _proxy_tuple_from_settings()
-        client = TelegramClient(StringSession(session_string), api_id_int, api_hash, proxy=proxy) if session_string else TelegramClient(session_name, api_id_int, api_hash, proxy=proxy)
+    # Настройки TG читаем один раз здесь (поток бэкфилла), а не в корутине на основном loop
+    tg_settings = _tg_client_settings()
 
-        checked = 0
+    async def _collect_linked_meta_batch(
+        targets: list[tuple[int, str]],
+    ) -> tuple[int, dict[int, dict[str, Any]], dict[str, Any]]:
+        """targets — пары (chat.id, identifier), подготовленные в потоке бэкфилла: ORM-объекты в корутину не передаём."""
         meta_by_chat_id: dict[int, dict[str, Any]] = {}
         joined_chat_ids: set[int] = set()
         join_stats: dict[str, Any] = {
@@ -2713,9 +2832,10 @@ def _backfill_telegram_linked_chats_once(*, force: bool = False) -> dict[str, An
             "auth_username": None,
         }
 
-        try:
-            await client.connect()
-            if not await client.is_user_authorized():
+        if tg_settings is None:
+            return (0, {}, join_stats)
+        async with _tg_rpc_client(tg_settings) as client:
+            if client is None:
                 return (0, {}, join_stats)
             try:
                 me = await client.get_me()
@@ -2729,6 +2849,9 @@ def _backfill_telegram_linked_chats_once(*, force: bool = False) -> dict[str, An
                 key = int(tg_chat_id) if tg_chat_id is not None else None
                 if key is not None and key in joined_chat_ids:
                     return "already"
+                if key is not None:
+                    # Резервируем до первого await: каналы обрабатываются параллельно (см. _process_channel)
+                    joined_chat_ids.add(key)
                 try:
                     entity = entity_or_ident
                     if isinstance(entity_or_ident, str):
@@ -2773,125 +2896,131 @@ def _backfill_telegram_linked_chats_once(*, force: bool = False) -> dict[str, An
                     if target_label and len(join_stats["failed_targets"]) < 50:
                         join_stats["failed_targets"].append(target_label)
                     return "failed"
-                finally:
-                    if key is not None:
-                        joined_chat_ids.add(key)
-                return "failed"
-
-            for ch in chats:
-                identifier = _chat_identifier(ch)
-                if identifier == "—":
-                    continue
-                checked += 1
-                try:
-                    entity = await client.get_entity(identifier)
-                    channel_tg_chat_id = _normalize_telethon_chat_id(getattr(entity, "id", None))
-                    await _join_once(
-                        entity,
-                        channel_tg_chat_id,
-                        target_label=f"channel:{identifier}",
-                    )
-                    full = await client(GetFullChannelRequest(entity))
-                    full_chat = getattr(full, "full_chat", None)
-                    linked_tg_chat_id = _normalize_telethon_chat_id(getattr(full_chat, "linked_chat_id", None))
-                    linked_username = None
-                    linked_title = None
-                    if linked_tg_chat_id is not None:
-                        linked_entity = None
-                        if getattr(full, "chats", None):
-                            for ch_obj in (full.chats or []):
-                                if _normalize_telethon_chat_id(getattr(ch_obj, "id", None)) == linked_tg_chat_id:
-                                    linked_entity = ch_obj
-                                    break
-                        if linked_entity is None:
-                            try:
-                                linked_entity = await client.get_entity(PeerChannel(abs(linked_tg_chat_id) % (10**10)))
-                            except Exception:
-                                linked_entity = None
-                        if linked_entity is not None:
-                            link_label = f"linked:{linked_username or linked_tg_chat_id}"
-                            join_result = await _join_once(linked_entity, linked_tg_chat_id, target_label=link_label)
-                            if join_result == "failed":
-                                # fallback на id, если объект не подошёл для join
-                                await _join_once(str(linked_tg_chat_id), linked_tg_chat_id, target_label=link_label)
-                            linked_username = getattr(linked_entity, "username", None)
-                            linked_title = getattr(linked_entity, "title", None) or getattr(linked_entity, "name", None)
-                        else:
-                            await _join_once(
-                                str(linked_tg_chat_id),
-                                linked_tg_chat_id,
-                                target_label=f"linked:{linked_tg_chat_id}",
-                            )
-
-                    meta_by_chat_id[ch.id] = {
-                        "channel_tg_chat_id": channel_tg_chat_id,
-                        "channel_username": getattr(entity, "username", None),
-                        "linked_tg_chat_id": linked_tg_chat_id,
-                        "linked_username": linked_username,
-                        "linked_title": linked_title,
-                    }
-                except Exception:
-                    continue
-            return (checked, meta_by_chat_id, join_stats)
-        finally:
-            try:
-                await client.disconnect()
-            except Exception:
-                pass
+
+            sem = asyncio.Semaphore(_TG_LINKED_BACKFILL_CONCURRENCY)
+
+            async def _process_channel(chat_id: int, identifier: str) -> None:
+                async with sem:
+                    try:
+                        entity = await client.get_entity(identifier)
+                        channel_tg_chat_id = _normalize_telethon_chat_id(getattr(entity, "id", None))
+                        await _join_once(
+                            entity,
+                            channel_tg_chat_id,
+                            target_label=f"channel:{identifier}",
+                        )
+                        full = await client(GetFullChannelRequest(entity))
+                        full_chat = getattr(full, "full_chat", None)
+                        linked_tg_chat_id = _normalize_telethon_chat_id(getattr(full_chat, "linked_chat_id", None))
+                        linked_username = None
+                        linked_title = None
+                        if linked_tg_chat_id is not None:
+                            linked_entity = None
+                            if getattr(full, "chats", None):
+                                for ch_obj in (full.chats or []):
+                                    if _normalize_telethon_chat_id(getattr(ch_obj, "id", None)) == linked_tg_chat_id:
+                                        linked_entity = ch_obj
+                                        break
+                            if linked_entity is None:
+                                try:
+                                    linked_entity = await client.get_entity(PeerChannel(abs(linked_tg_chat_id) % (10**10)))
+                                except Exception:
+                                    linked_entity = None
+                            if linked_entity is not None:
+                                link_label = f"linked:{linked_username or linked_tg_chat_id}"
+                                join_result = await _join_once(linked_entity, linked_tg_chat_id, target_label=link_label)
+                                if join_result == "failed":
+                                    # fallback на id, если объект не подошёл для join
+                                    await _join_once(str(linked_tg_chat_id), linked_tg_chat_id, target_label=link_label)
+                                linked_username = getattr(linked_entity, "username", None)
+                                linked_title = getattr(linked_entity, "title", None) or getattr(linked_entity, "name", None)
+                            else:
+                                await _join_once(
+                                    str(linked_tg_chat_id),
+                                    linked_tg_chat_id,
+                                    target_label=f"linked:{linked_tg_chat_id}",
+                                )
+
+                        meta_by_chat_id[chat_id] = {
+                            "channel_tg_chat_id": channel_tg_chat_id,
+                            "channel_username": getattr(entity, "username", None),
+                            "linked_tg_chat_id": linked_tg_chat_id,
+                            "linked_username": linked_username,
+                            "linked_title": linked_title,
+                        }
+                    except Exception:
+                        return
+
+            await asyncio.gather(*(_process_channel(chat_id, identifier) for chat_id, identifier in targets))
+            return (len(targets), meta_by_chat_id, join_stats)
 
     with SessionLocal() as db:
-        all_tg_chats = db.scalars(
+        # Обрабатываем только один "root"-кандидат на billing_key (или сам чат, если ключ не задан),
+        # чтобы не делать повторные запросы к Telegram для уже добавленных discussion-чатов.
+        # Кандидат — чат с минимальным id в своей единице; отбор делает БД.
+        unit_key = func.coalesce(
+            func.nullif(func.trim(Chat.billing_key), ""),
+            literal("chat:") + cast(Chat.id, String),
+        )
+        root_ids = select(func.min(Chat.id)).where(Chat.source == CHAT_SOURCE_TELEGRAM).group_by(unit_key)
+        candidates = db.scalars(
             select(Chat)
-            .where(Chat.source == CHAT_SOURCE_TELEGRAM)
+            .where(Chat.id.in_(root_ids))
             .order_by(Chat.id.asc())
             .options(selectinload(Chat.groups))
         ).all()
-        # Обрабатываем только один "root"-кандидат на billing_key (или сам чат, если ключ не задан),
-        # чтобы не делать повторные запросы к Telegram для уже добавленных discussion-чатов.
-        candidates: list[Chat] = []
-        seen_units: set[str] = set()
-        for ch in all_tg_chats:
-            unit_key = (getattr(ch, "billing_key", None) or f"chat:{ch.id}").strip()
-            if unit_key in seen_units:
-                continue
-            seen_units.add(unit_key)
-            candidates.append(ch)
-
-        checked, meta_by_chat_id, join_stats = asyncio.run(_collect_linked_meta_batch(candidates))
-        changed_total = 0
-        for channel in candidates:
-            meta = meta_by_chat_id.get(channel.id)
-            if not meta:
-                continue
-            linked_tg_chat_id = meta.get("linked_tg_chat_id")
-            if linked_tg_chat_id is None:
-                continue
 
-            billing_key = (
-                getattr(channel, "billing_key", None)
-                or _make_telegram_billing_key(
-                    meta.get("channel_tg_chat_id") or channel.tg_chat_id,
-                    meta.get("channel_username") or channel.username,
-                    channel.invite_hash,
-                )
-            )
-            if billing_key and getattr(channel, "billing_key", None) != billing_key:
-                channel.billing_key = billing_key
-                db.add(channel)
-                changed_total += 1
+        # На основном loop через общий сервисный клиент (см. _run_tg_rpc), без отдельного event loop на вызов
+        targets: list[tuple[int, str]] = []
+        for ch in candidates:
+            identifier = _chat_identifier(ch)
+            if identifier != "—":
+                targets.append((ch.id, identifier))
+        checked, meta_by_chat_id, join_stats = _run_tg_rpc(lambda: _collect_linked_meta_batch(targets), timeout=None)
+        # Фаза записи — под общим замком: бэкфилл при старте и ручной запуск из админки
+        # не должны параллельно создавать одни и те же linked-чаты и подписки.
+        with _linked_backfill_write_lock:
+            changed_total = 0
+            for i, channel in enumerate(candidates, start=1):
+                if i % _TG_LINKED_BACKFILL_COMMIT_EVERY == 0:
+                    db.commit()
+                meta = meta_by_chat_id.get(channel.id)
+                if not meta:
+                    continue
+                linked_tg_chat_id = meta.get("linked_tg_chat_id")
+                if linked_tg_chat_id is None:
+                    continue
 
-            changed = _upsert_linked_chat_for_channel(
-                db,
-                channel,
-                linked_tg_chat_id=int(linked_tg_chat_id),
-                linked_username=meta.get("linked_username"),
-                linked_title=meta.get("linked_title"),
-                billing_key=billing_key,
-            )
-            if changed:
-                changed_total += 1
+                current_key = channel.billing_key
+                billing_key = (
+                    current_key
+                    or _make_telegram_billing_key(
+                        meta.get("channel_tg_chat_id") or channel.tg_chat_id,
+                        meta.get("channel_username") or channel.username,
+                        channel.invite_hash,
+                    )
+                )
+                if billing_key and current_key != billing_key:
+                    channel.billing_key = billing_key
+                    db.add(channel)
+                    changed_total += 1
+
+                changed = _upsert_linked_chat_for_channel(
+                    db,
+                    channel,
+                    linked_tg_chat_id=int(linked_tg_chat_id),
+                    linked_username=meta.get("linked_username"),
+                    linked_title=meta.get("linked_title"),
+                    billing_key=billing_key,
+                )
+                if changed:
+                    changed_total += 1
+                db.flush()
             db.commit()
+        if changed_total:
+            _invalidate_chat_group_catalog()
 
+        # Флаг — после коммита: при сбое бэкфилл повторится при следующем старте
         set_parser_setting(_TG_LINKED_BACKFILL_FLAG, "1")
         log.info(
             "TG linked-chat backfill complete: checked=%s changed=%s (flag=%s).",
@@ -2945,6 +3074,59 @@ def _chat_bundle_meta(db: Session | None, c: Chat) -> tuple[int, bool]:
     return (size, size > 1)
 
 
+def _chat_bundle_meta_many(db: Session, chats: Iterable[Chat]) -> dict[int, tuple[int, bool]]:
+    """То же, что _chat_bundle_meta, для списка чатов: два GROUP BY вместо COUNT на каждый чат."""
+    global_keys: set[str] = set()
+    user_keys: set[tuple[int, str]] = set()
+    keyed: list[tuple[Chat, str]] = []
+    for c in chats:
+        if (c.source or CHAT_SOURCE_TELEGRAM) != CHAT_SOURCE_TELEGRAM:
+            continue
+        bk = c.billing_key
+        billing_key = bk.strip() if bk else ""
+        if not billing_key:
+            continue
+        keyed.append((c, billing_key))
+        if c.is_global:
+            global_keys.add(billing_key)
+        else:
+            user_keys.add((c.user_id, billing_key))
+    global_counts: dict[str, int] = {}
+    if global_keys:
+        global_counts = dict(
+            db.execute(
+                select(Chat.billing_key, func.count(Chat.id))
+                .where(
+                    Chat.is_global.is_(True),
+                    Chat.source == CHAT_SOURCE_TELEGRAM,
+                    Chat.billing_key.in_(global_keys),
+                )
+                .group_by(Chat.billing_key)
+            ).all()
+        )
+    user_counts: dict[tuple[int, str], int] = {}
+    if user_keys:
+        for uid, billing_key, cnt in db.execute(
+            select(Chat.user_id, Chat.billing_key, func.count(Chat.id))
+            .where(
+                Chat.user_id.in_({uid for uid, _ in user_keys}),
+                Chat.source == CHAT_SOURCE_TELEGRAM,
+                Chat.billing_key.in_({k for _, k in user_keys}),
+            )
+            .group_by(Chat.user_id, Chat.billing_key)
+        ):
+            user_counts[(uid, billing_key)] = cnt
+    out: dict[int, tuple[int, bool]] = {}
+    for c, billing_key in keyed:
+        if c.is_global:
+            size = global_counts.get(billing_key, 0)
+        else:
+            size = user_counts.get((c.user_id, billing_key), 0)
+        size = max(1, int(size))
+        out[c.id] = (size, size > 1)
+    return out
+
+
 def _chat_identifier(c: Chat) -> str:
     """Человекочитаемый идентификатор чата для API."""
     source = getattr(c, "source", None) or CHAT_SOURCE_TELEGRAM
@@ -2966,6 +3148,7 @@ def _chat_to_out(
     is_owner: bool,
     subscription_enabled: bool | None = None,
     db: Session | None = None,
+    bundle_meta: tuple[int, bool] | None = None,
 ) -> ChatOut:
     source = getattr(c, "source", None) or CHAT_SOURCE_TELEGRAM
     if source == CHAT_SOURCE_MAX:
@@ -2976,17 +3159,15 @@ def _chat_to_out(
             or (str(c.tg_chat_id) if c.tg_chat_id is not None else "")
             or (f"t.me/joinchat/{c.invite_hash}" if getattr(c, "invite_hash", None) else "")
         ) or "—"
-    created_at = c.created_at
-    if created_at.tzinfo is None:
-        created_at = created_at.replace(tzinfo=timezone.utc)
     # Для подписок реальное состояние мониторинга = состояние подписки пользователя И состояние канала.
     enabled = (
         bool(c.enabled) and bool(subscription_enabled)
         if subscription_enabled is not None
         else bool(c.enabled)
     )
-    bundle_size, has_linked_chat = _chat_bundle_meta(db, c)
-    return ChatOut(
+    bundle_size, has_linked_chat = bundle_meta if bundle_meta is not None else _chat_bundle_meta(db, c)
+    # Поля уже нужных типов (колонки БД) — model_construct без повторной валидации на каждый чат списка
+    return ChatOut.model_construct(
         id=c.id,
         identifier=identifier,
         title=c.title,
@@ -2999,51 +3180,49 @@ def _chat_to_out(
         source=source,
         hasLinkedChat=has_linked_chat,
         bundleSize=bundle_size,
-        createdAt=created_at.isoformat(),
+        createdAt=_iso_utc(c.created_at),
     )
 
 
 @app.get("/api/chats", response_model=list[ChatOut])
 def list_chats(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> list[ChatOut]:
-    _ensure_default_user(db)
     out: list[ChatOut] = []
     seen_ids: set[int] = set()
     # Свои каналы (включая глобальные, созданные админом)
-    owned = db.scalars(select(Chat).where(Chat.user_id == user.id).order_by(Chat.id.asc())).all()
+    owned = db.scalars(
+        select(Chat).options(selectinload(Chat.groups)).where(Chat.user_id == user.id).order_by(Chat.id.asc())
+    ).all()
+    # Подписки на глобальные каналы вместе с флагом enabled подписки — одним запросом
+    sub_rows = db.execute(
+        select(Chat, user_chat_subscriptions.c.enabled)
+        .options(selectinload(Chat.groups))
+        .join(user_chat_subscriptions, Chat.id == user_chat_subscriptions.c.chat_id)
+        .where(user_chat_subscriptions.c.user_id == user.id)
+        .order_by(Chat.id.asc())
+    ).all()
+    bundle_meta = _chat_bundle_meta_many(db, [*owned, *(c for c, _ in sub_rows)])
+    no_bundle = (1, False)
     for c in owned:
         seen_ids.add(c.id)
-        out.append(_chat_to_out(c, is_owner=True, db=db))
-    # Подписки на глобальные каналы
-    sub_rows = (
-        db.execute(
-            select(Chat).join(user_chat_subscriptions).where(
-                user_chat_subscriptions.c.user_id == user.id,
-                Chat.id == user_chat_subscriptions.c.chat_id,
-            ).order_by(Chat.id.asc())
-        )
-    ).scalars().all()
-    sub_enabled_map: dict[int, bool] = {}
-    try:
-        sub_enabled_rows = db.execute(
-            select(user_chat_subscriptions.c.chat_id, user_chat_subscriptions.c.enabled).where(
-                user_chat_subscriptions.c.user_id == user.id
-            )
-        ).all()
-        for r in sub_enabled_rows:
-            sub_enabled_map[r[0]] = r[1] if (len(r) > 1 and r[1] is not None) else True
-    except Exception:
-        pass  # колонка enabled может отсутствовать до миграции
-    for c in sub_rows:
+        out.append(_chat_to_out(c, is_owner=True, db=db, bundle_meta=bundle_meta.get(c.id, no_bundle)))
+    for c, sub_enabled in sub_rows:
         if c.id not in seen_ids:
             seen_ids.add(c.id)
-            out.append(_chat_to_out(c, is_owner=False, subscription_enabled=sub_enabled_map.get(c.id, True), db=db))
+            out.append(
+                _chat_to_out(
+                    c,
+                    is_owner=False,
+                    subscription_enabled=True if sub_enabled is None else bool(sub_enabled),
+                    db=db,
+                    bundle_meta=bundle_meta.get(c.id, no_bundle),
+                )
+            )
     out.sort(key=lambda x: x.id)
     return out
 
 
 @app.post("/api/chats", response_model=ChatOut)
 def create_chat(body: ChatCreate, user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> ChatOut:
-    _ensure_default_user(db)
     user_id = user.id
     _check_plan_can_track(user)
 
@@ -3059,6 +3238,8 @@ def create_chat(body: ChatCreate, user: User = Depends(get_current_user), db: Se
     if source not in ("telegram", "max"):
         source = CHAT_SOURCE_TELEGRAM
 
+    # groups нужны _chat_to_out в ответе для уже существующего глобального канала
+    global_chat_q = select(Chat).options(selectinload(Chat.groups)).where(Chat.is_global.is_(True))
     if source == CHAT_SOURCE_MAX:
         username, tg_chat_id, invite_hash = None, None, None
         max_chat_id = ident
@@ -3067,11 +3248,7 @@ def create_chat(body: ChatCreate, user: User = Depends(get_current_user), db: Se
         linked_username = None
         linked_title = None
         existing_global = db.scalar(
-            select(Chat).where(
-                Chat.is_global.is_(True),
-                Chat.source == CHAT_SOURCE_MAX,
-                Chat.max_chat_id == max_chat_id,
-            )
+            global_chat_q.where(Chat.source == CHAT_SOURCE_MAX, Chat.max_chat_id == max_chat_id)
         )
     else:
         username, tg_chat_id, invite_hash = _parse_chat_identifier(ident)
@@ -3094,23 +3271,19 @@ def create_chat(body: ChatCreate, user: User = Depends(get_current_user), db: Se
         existing_global = None
         if billing_key:
             existing_global = db.scalar(
-                select(Chat).where(
-                    Chat.is_global.is_(True),
-                    Chat.source == CHAT_SOURCE_TELEGRAM,
-                    Chat.billing_key == billing_key,
-                )
+                global_chat_q.where(Chat.source == CHAT_SOURCE_TELEGRAM, Chat.billing_key == billing_key)
             )
         if existing_global is None and tg_chat_id is not None:
             existing_global = db.scalar(
-                select(Chat).where(Chat.is_global.is_(True), Chat.source == CHAT_SOURCE_TELEGRAM, Chat.tg_chat_id == tg_chat_id)
+                global_chat_q.where(Chat.source == CHAT_SOURCE_TELEGRAM, Chat.tg_chat_id == tg_chat_id)
             )
         if existing_global is None and username:
             existing_global = db.scalar(
-                select(Chat).where(Chat.is_global.is_(True), Chat.source == CHAT_SOURCE_TELEGRAM, Chat.username == username)
+                global_chat_q.where(Chat.source == CHAT_SOURCE_TELEGRAM, Chat.username == username)
             )
         if existing_global is None and invite_hash:
             existing_global = db.scalar(
-                select(Chat).where(Chat.is_global.is_(True), Chat.source == CHAT_SOURCE_TELEGRAM, Chat.invite_hash == invite_hash)
+                global_chat_q.where(Chat.source == CHAT_SOURCE_TELEGRAM, Chat.invite_hash == invite_hash)
             )
 
     if existing_global is not None:
@@ -3119,7 +3292,8 @@ def create_chat(body: ChatCreate, user: User = Depends(get_current_user), db: Se
             _check_limits(db, user, delta_channels=1)
         _upsert_individual_subscriptions(db, user_id, bundle_chats)
         db.commit()
-        db.refresh(existing_global)
+        _invalidate_plan_cache(user_id)
+        # Сам канал не менялся (только подписки) — refresh не нужен и сбросил бы загруженные groups
         return _chat_to_out(existing_global, is_owner=False, db=db)
 
     _check_limits(db, user, delta_channels=1, delta_own_channels=1)
@@ -3141,25 +3315,19 @@ def create_chat(body: ChatCreate, user: User = Depends(get_current_user), db: Se
         groups = db.scalars(select(ChatGroup).where(ChatGroup.user_id == user_id, ChatGroup.id.in_(body.groupIds))).all()
         c.groups = list(groups)
     db.add(c)
-    db.commit()
-    db.refresh(c)
+    db.flush()
 
     if source == CHAT_SOURCE_TELEGRAM and linked_tg_chat_id is not None:
+        # Один SELECT: совпадение по tg_chat_id приоритетнее совпадения по username
+        linked_match = Chat.tg_chat_id == linked_tg_chat_id
+        if linked_username:
+            linked_match = or_(linked_match, Chat.username == linked_username)
         linked_existing = db.scalar(
-            select(Chat).where(
-                Chat.user_id == user_id,
-                Chat.source == CHAT_SOURCE_TELEGRAM,
-                Chat.tg_chat_id == linked_tg_chat_id,
-            )
+            select(Chat)
+            .where(Chat.user_id == user_id, Chat.source == CHAT_SOURCE_TELEGRAM, linked_match)
+            .order_by(case((Chat.tg_chat_id == linked_tg_chat_id, 0), else_=1), Chat.id.asc())
+            .limit(1)
         )
-        if linked_existing is None and linked_username:
-            linked_existing = db.scalar(
-                select(Chat).where(
-                    Chat.user_id == user_id,
-                    Chat.source == CHAT_SOURCE_TELEGRAM,
-                    Chat.username == linked_username,
-                )
-            )
         if linked_existing is None:
             linked_chat = Chat(
                 user_id=user_id,
@@ -3186,8 +3354,13 @@ def create_chat(body: ChatCreate, user: User = Depends(get_current_user), db: Se
             if body.groupIds:
                 linked_existing.groups = list(c.groups or [])
             db.add(linked_existing)
-        db.commit()
 
+    # Канал и его discussion-чат — одной транзакцией
+    db.commit()
+    _invalidate_plan_cache(user_id)
+    if is_global:
+        _invalidate_chat_group_catalog()
+    db.refresh(c)
     return _chat_to_out(c, is_owner=True, db=db)
 
 
@@ -3236,6 +3409,9 @@ def update_chat(chat_id: int, body: ChatUpdate, user: User = Depends(get_current
 
     db.add(c)
     db.commit()
+    _invalidate_plan_cache(None if user.is_admin else user.id)
+    if user.is_admin:
+        _invalidate_chat_group_catalog()
     db.refresh(c)
 
     return _chat_to_out(c, is_owner=True, db=db)
@@ -3243,151 +3419,215 @@ def update_chat(chat_id: int, body: ChatUpdate, user: User = Depends(get_current
 
 @app.get("/api/chat-groups", response_model=list[ChatGroupOut])
 def list_chat_groups(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> list[ChatGroupOut]:
-    _ensure_default_user(db)
     rows = db.scalars(select(ChatGroup).where(ChatGroup.user_id == user.id).order_by(ChatGroup.id.asc())).all()
     out: list[ChatGroupOut] = []
     for g in rows:
-        created_at = g.created_at
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
         out.append(
             ChatGroupOut(
                 id=g.id,
                 name=g.name,
                 description=g.description,
                 userId=g.user_id,
-                createdAt=created_at.isoformat(),
+                createdAt=_iso_utc(g.created_at),
             )
         )
     return out
 
 
+# Каталог тематических групп администраторов (с глобальными каналами) общий для всех пользователей
+# и открывается на каждой загрузке дашборда. Кэшируется целиком; признак подписки считается на запрос.
+# Сбрасывается через _invalidate_chat_group_catalog при изменении групп, каналов и администраторов.
+_CHAT_GROUP_CATALOG_TTL_SEC = 30.0
+_chat_group_catalog_cache: tuple[float, list[tuple[int, str, str | None, list[ChatGroupChannelOut]]]] | None = None
+
+
+def _invalidate_chat_group_catalog() -> None:
+    global _chat_group_catalog_cache
+    _chat_group_catalog_cache = None
+
+
+def _get_chat_group_catalog(db: Session) -> list[tuple[int, str, str | None, list[ChatGroupChannelOut]]]:
+    """Группы администраторов с их глобальными каналами: (id, name, description, channels)."""
+    global _chat_group_catalog_cache
+    now = time.monotonic()
+    cached = _chat_group_catalog_cache
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    admin_ids = _get_admin_ids(db)
+    catalog: list[tuple[int, str, str | None, list[ChatGroupChannelOut]]] = []
+    if admin_ids:
+        # Только нужные колонки, без ORM-объектов: группы администраторов и их глобальные каналы
+        channel_rows = db.execute(
+            select(
+                chat_group_links.c.group_id,
+                Chat.id,
+                Chat.username,
+                Chat.tg_chat_id,
+                Chat.invite_hash,
+                Chat.title,
+            )
+            .join(Chat, Chat.id == chat_group_links.c.chat_id)
+            .join(ChatGroup, ChatGroup.id == chat_group_links.c.group_id)
+            .where(ChatGroup.user_id.in_(admin_ids), Chat.is_global.is_(True))
+            .order_by(chat_group_links.c.group_id.asc(), Chat.id.asc())
+        ).all()
+        channels_by_group: dict[int, list[ChatGroupChannelOut]] = {}
+        for group_id, chat_id, username, tg_chat_id, invite_hash, title in channel_rows:
+            ident = (
+                (username or "")
+                or (str(tg_chat_id) if tg_chat_id is not None else "")
+                or (f"t.me/joinchat/{invite_hash}" if invite_hash else "")
+            ) or "—"
+            channels_by_group.setdefault(group_id, []).append(
+                ChatGroupChannelOut(id=chat_id, identifier=ident, title=title)
+            )
+        if channels_by_group:
+            # Группы без глобальных каналов сюда не попадают
+            group_rows = db.execute(
+                select(ChatGroup.id, ChatGroup.name, ChatGroup.description)
+                .where(ChatGroup.id.in_(list(channels_by_group)))
+                .order_by(ChatGroup.id.asc())
+            ).all()
+            catalog = [
+                (group_id, name, description, channels_by_group[group_id])
+                for group_id, name, description in group_rows
+            ]
+    _chat_group_catalog_cache = (now + _CHAT_GROUP_CATALOG_TTL_SEC, catalog)
+    return catalog
+
+
 @app.get("/api/chat-groups/available", response_model=list[ChatGroupAvailableOut])
 def list_available_chat_groups(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> list[ChatGroupAvailableOut]:
     """Группы каналов по тематикам, созданные администраторами. Пользователь может подписаться на всю группу сразу.
     Подписан только если есть запись в user_thematic_group_subscriptions для текущего user.id."""
-    _ensure_default_user(db)
-    admin_ids = set(db.scalars(select(User.id).where(User.is_admin.is_(True))).all() or ())
-    if not admin_ids:
+    catalog = _get_chat_group_catalog(db)
+    if not catalog:
         return []
-    groups = db.scalars(
-        select(ChatGroup)
-        .where(ChatGroup.user_id.in_(admin_ids))
-        .order_by(ChatGroup.id.asc())
-        .options(selectinload(ChatGroup.chats))
-    ).all()
-    rows = db.execute(
-        select(user_thematic_group_subscriptions.c.group_id).where(
-            user_thematic_group_subscriptions.c.user_id == user.id
-        )
-    ).all()
-    subscribed_group_ids = {int(r[0]) for r in rows if r[0] is not None}
-    out: list[ChatGroupAvailableOut] = []
-    for g in groups:
-        global_chats = [c for c in (g.chats or []) if c.is_global]
-        if not global_chats:
-            continue
-        channel_outs = []
-        for c in global_chats:
-            ident = (
-                (c.username or "")
-                or (str(c.tg_chat_id) if c.tg_chat_id is not None else "")
-                or (f"t.me/joinchat/{c.invite_hash}" if getattr(c, "invite_hash", None) else "")
-            ) or "—"
-            channel_outs.append(ChatGroupChannelOut(id=c.id, identifier=ident, title=c.title))
-        subscribed = g.id in subscribed_group_ids
-        out.append(
-            ChatGroupAvailableOut(
-                id=g.id,
-                name=g.name,
-                description=g.description,
-                channelCount=len(global_chats),
-                channels=channel_outs,
-                subscribed=subscribed,
+    subscribed_ids = frozenset(
+        db.scalars(
+            select(user_thematic_group_subscriptions.c.group_id).where(
+                user_thematic_group_subscriptions.c.user_id == user.id
             )
+        ).all()
+    )
+    return [
+        ChatGroupAvailableOut(
+            id=group_id,
+            name=name,
+            description=description,
+            channelCount=len(channel_outs),
+            channels=channel_outs,
+            subscribed=group_id in subscribed_ids,
         )
-    return out
+        for group_id, name, description, channel_outs in catalog
+    ]
+
+
+def _group_global_chat_ids(db: Session, group_id: int) -> list[int]:
+    """Id глобальных каналов тематической группы — без загрузки ORM-объектов."""
+    return list(
+        db.scalars(
+            select(Chat.id)
+            .join(chat_group_links, chat_group_links.c.chat_id == Chat.id)
+            .where(chat_group_links.c.group_id == group_id, Chat.is_global.is_(True))
+            .order_by(Chat.id.asc())
+        ).all()
+    )
 
 
 @app.post("/api/chat-groups/{group_id}/subscribe")
 def subscribe_chat_group(group_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> dict[str, Any]:
     """Подписаться на все глобальные каналы в группе (мониторинг всех каналов группы сразу)."""
-    _ensure_default_user(db)
     _check_plan_can_track(user)
-    g = db.scalar(
-        select(ChatGroup).where(ChatGroup.id == group_id).options(selectinload(ChatGroup.chats))
-    )
-    if not g:
-        raise HTTPException(status_code=404, detail="group not found")
-    admin_ids = set(db.scalars(select(User.id).where(User.is_admin.is_(True))).all() or ())
-    if g.user_id not in admin_ids:
-        raise HTTPException(status_code=404, detail="group not available")
-    global_chats = [c for c in (g.chats or []) if c.is_global]
-    already_subscribed_to_group = db.execute(
-        select(user_thematic_group_subscriptions).where(
-            user_thematic_group_subscriptions.c.user_id == user.id,
-            user_thematic_group_subscriptions.c.group_id == group_id,
+    # Группа, «владелец — админ» и «уже подписан» — одним запросом
+    group_row = db.execute(
+        select(
+            User.is_admin,
+            exists()
+            .where(
+                user_thematic_group_subscriptions.c.user_id == user.id,
+                user_thematic_group_subscriptions.c.group_id == ChatGroup.id,
+            )
+            .correlate(ChatGroup)
+            .label("subscribed"),
         )
+        .select_from(ChatGroup)
+        .join(User, User.id == ChatGroup.user_id)
+        .where(ChatGroup.id == group_id)
     ).first()
-    if already_subscribed_to_group:
-        return {"ok": True, "subscribedCount": len(global_chats)}
+    if group_row is None:
+        raise HTTPException(status_code=404, detail="group not found")
+    if not group_row.is_admin:
+        raise HTTPException(status_code=404, detail="group not available")
+    global_chat_ids = _group_global_chat_ids(db, group_id)
+    if group_row.subscribed:
+        return {"ok": True, "subscribedCount": len(global_chat_ids)}
     _check_limits(db, user, delta_groups=1)
     # Каналы группы в лимит каналов не входят — проверку delta_channels не делаем
-    sub_ids = set(
-        db.execute(
-            select(user_chat_subscriptions.c.chat_id).where(user_chat_subscriptions.c.user_id == user.id)
-        ).scalars().all()
-    )
+    sub_ids: frozenset[int] = frozenset()
+    if global_chat_ids:
+        # Только подписки на каналы этой группы, а не все подписки пользователя
+        sub_ids = frozenset(
+            db.scalars(
+                select(user_chat_subscriptions.c.chat_id).where(
+                    user_chat_subscriptions.c.user_id == user.id,
+                    user_chat_subscriptions.c.chat_id.in_(global_chat_ids),
+                )
+            ).all()
+        )
     db.execute(
         user_thematic_group_subscriptions.insert().values(user_id=user.id, group_id=group_id)
     )
-    for c in global_chats:
-        if c.id not in sub_ids:
-            db.execute(
-                user_chat_subscriptions.insert().values(
-                    user_id=user.id, chat_id=c.id, via_group_id=group_id, enabled=True
-                )
-            )
+    new_subs = [
+        {"user_id": user.id, "chat_id": cid, "via_group_id": group_id, "enabled": True}
+        for cid in global_chat_ids
+        if cid not in sub_ids
+    ]
+    if new_subs:
+        db.execute(user_chat_subscriptions.insert(), new_subs)  # executemany одним вызовом
     db.commit()
-    return {"ok": True, "subscribedCount": len(global_chats)}
+    _invalidate_plan_cache(user.id)
+    return {"ok": True, "subscribedCount": len(global_chat_ids)}
 
 
 @app.post("/api/chat-groups/{group_id}/unsubscribe")
 def unsubscribe_chat_group(group_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> dict[str, Any]:
     """Отписаться от всех каналов в группе."""
-    _ensure_default_user(db)
-    g = db.scalar(
-        select(ChatGroup).where(ChatGroup.id == group_id).options(selectinload(ChatGroup.chats))
-    )
-    if not g:
+    group_owner_id = db.scalar(select(ChatGroup.user_id).where(ChatGroup.id == group_id))
+    if group_owner_id is None:
         raise HTTPException(status_code=404, detail="group not found")
-    admin_ids = set(db.scalars(select(User.id).where(User.is_admin.is_(True))).all() or ())
-    if g.user_id not in admin_ids:
+    admin_ids = _get_admin_ids(db)
+    if group_owner_id not in admin_ids:
         raise HTTPException(status_code=404, detail="group not available")
-    global_chat_ids = [c.id for c in (g.chats or []) if c.is_global]
-    db.execute(
-        user_thematic_group_subscriptions.delete().where(
-            user_thematic_group_subscriptions.c.user_id == user.id,
-            user_thematic_group_subscriptions.c.group_id == group_id,
-        )
+    thematic_delete = user_thematic_group_subscriptions.delete().where(
+        user_thematic_group_subscriptions.c.user_id == user.id,
+        user_thematic_group_subscriptions.c.group_id == group_id,
     )
-    unsub_count = 0
-    if global_chat_ids:
-        r = db.execute(
-            user_chat_subscriptions.delete().where(
-                user_chat_subscriptions.c.user_id == user.id,
-                user_chat_subscriptions.c.chat_id.in_(global_chat_ids),
-                user_chat_subscriptions.c.via_group_id == group_id,
-            )
-        )
-        unsub_count = r.rowcount
+    # Глобальные каналы группы — подзапросом, без отдельного SELECT их id
+    group_chat_ids = (
+        select(chat_group_links.c.chat_id)
+        .join(Chat, Chat.id == chat_group_links.c.chat_id)
+        .where(chat_group_links.c.group_id == group_id, Chat.is_global.is_(True))
+    )
+    channels_delete = user_chat_subscriptions.delete().where(
+        user_chat_subscriptions.c.user_id == user.id,
+        user_chat_subscriptions.c.chat_id.in_(group_chat_ids),
+        user_chat_subscriptions.c.via_group_id == group_id,
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Обе таблицы — одним запросом: DELETE подписки на группу как data-modifying CTE
+        r = db.execute(channels_delete.add_cte(thematic_delete.cte("thematic_deleted")))
+    else:
+        db.execute(thematic_delete)
+        r = db.execute(channels_delete)
+    unsub_count = r.rowcount
     db.commit()
+    _invalidate_plan_cache(user.id)
     return {"ok": True, "unsubscribedCount": unsub_count}
 
 
 @app.post("/api/chat-groups", response_model=ChatGroupOut)
 def create_chat_group(body: ChatGroupCreate, user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> ChatGroupOut:
-    _ensure_default_user(db)
     user_id = user.id
     _check_plan_can_track(user)
     _check_limits(db, user, delta_groups=1)
@@ -3399,17 +3639,16 @@ def create_chat_group(body: ChatGroupCreate, user: User = Depends(get_current_us
     g = ChatGroup(user_id=user_id, name=name, description=body.description)
     db.add(g)
     db.commit()
-    db.refresh(g)
+    _invalidate_plan_cache(user.id)
+    if user.is_admin:
+        _invalidate_chat_group_catalog()
 
-    created_at = g.created_at
-    if created_at.tzinfo is None:
-        created_at = created_at.replace(tzinfo=timezone.utc)
     return ChatGroupOut(
         id=g.id,
         name=g.name,
         description=g.description,
         userId=g.user_id,
-        createdAt=created_at.isoformat(),
+        createdAt=_iso_utc(g.created_at),
     )
 
 
@@ -3422,34 +3661,42 @@ def delete_chat_group(group_id: int, user: User = Depends(get_current_user), db:
         raise HTTPException(status_code=403, detail="forbidden")
     db.delete(g)
     db.commit()
+    _invalidate_plan_cache(None if user.is_admin else user.id)
+    if user.is_admin:
+        _invalidate_chat_group_catalog()
     return {"ok": True}
 
 
 @app.get("/api/users", response_model=list[UserOut])
 def list_users(_: User = Depends(get_current_admin), db: Session = Depends(get_db)) -> list[UserOut]:
-    _ensure_default_user(db)
     rows = db.scalars(select(User).order_by(User.id.asc())).all()
     return [_user_to_out(u) for u in rows]
 
 
 @app.post("/api/users", response_model=UserOut)
 def create_user(body: UserCreate, _: User = Depends(get_current_admin), db: Session = Depends(get_db)) -> UserOut:
-    _ensure_default_user(db)
+    password = (body.password or "").strip()
+    password_hash = None
+    if password:
+        # bcrypt — сотни миллисекунд CPU: завершаем транзакцию проверки токена,
+        # чтобы соединение вернулось в пул и не простаивало на время хеширования
+        db.commit()
+        password_hash = hash_password(password)
     u = User(
         email=body.email,
         name=body.name,
         is_admin=bool(body.isAdmin),
-        password_hash=hash_password(body.password.strip()) if (body.password and body.password.strip()) else None,
+        password_hash=password_hash,
     )
     db.add(u)
     db.commit()
-    db.refresh(u)
+    if u.is_admin:
+        _invalidate_admin_ids_cache()
     return _user_to_out(u)
 
 
 @app.patch("/api/users/{user_id}", response_model=UserOut)
 def update_user(user_id: int, body: UserUpdate, _: User = Depends(get_current_admin), db: Session = Depends(get_db)) -> UserOut:
-    _ensure_default_user(db)
     u = db.scalar(select(User).where(User.id == user_id))
     if not u:
         raise HTTPException(status_code=404, detail="user not found")
@@ -3462,21 +3709,15 @@ def update_user(user_id: int, body: UserUpdate, _: User = Depends(get_current_ad
         u.is_admin = bool(body.isAdmin)
     if body.plan is not None and body.plan.strip() in ("free", "basic", "pro", "business"):
         u.plan_slug = body.plan.strip()
-    if body.planExpiresAt is not None:
-        if body.planExpiresAt.strip() == "":
-            u.plan_expires_at = None
-        else:
-            try:
-                dt = datetime.fromisoformat(body.planExpiresAt.replace("Z", "+00:00"))
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                u.plan_expires_at = dt
-            except ValueError:
-                pass
+    if "planExpiresAt" in body.model_fields_set:
+        # Дата уже разобрана и приведена к UTC валидатором модели; None — снять срок
+        u.plan_expires_at = body.planExpiresAt
 
     db.add(u)
     db.commit()
-    db.refresh(u)
+    _invalidate_plan_cache(user_id)
+    if body.isAdmin is not None:
+        _invalidate_admin_ids_cache()
     return _user_to_out(u)
 
 
@@ -3488,11 +3729,13 @@ def admin_set_user_password(
     db: Session = Depends(get_db),
 ) -> dict[str, Any]:
     """Установить новый пароль для любой учётной записи (только администратор)."""
-    _ensure_default_user(db)
+    # Хешируем до запроса пользователя и вне транзакции проверки токена — соединение на время bcrypt в пуле
+    db.commit()
+    password_hash = hash_password(body.newPassword)
     u = db.scalar(select(User).where(User.id == user_id))
     if not u:
         raise HTTPException(status_code=404, detail="user not found")
-    u.password_hash = hash_password(body.newPassword)
+    u.password_hash = password_hash
     db.add(u)
     db.commit()
     return {"ok": True}
@@ -3500,43 +3743,61 @@ def admin_set_user_password(
 
 @app.delete("/api/users/{user_id}")
 def delete_user(user_id: int, _: User = Depends(get_current_admin), db: Session = Depends(get_db)) -> dict[str, Any]:
-    _ensure_default_user(db)
     if user_id == 1:
         raise HTTPException(status_code=400, detail="default user cannot be deleted")
     u = db.scalar(select(User).where(User.id == user_id))
     if not u:
         raise HTTPException(status_code=404, detail="user not found")
+    was_admin = bool(u.is_admin)
     db.delete(u)
     db.commit()
+    _invalidate_plan_cache(user_id)
+    if was_admin:
+        _invalidate_admin_ids_cache()
     return {"ok": True}
 
 
+def _in_own_session(fn: Callable[..., Any], *args: Any) -> Any:
+    """fn(db, *args) в отдельной сессии — чтобы независимые чтения шли параллельно в threadpool."""
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        return fn(db, *args)
+
+
+def _mentions_count_by_user_id(db: Session, user_id: int) -> int:
+    # COUNT(*), а не COUNT(id): PostgreSQL может посчитать по индексу user_id, не читая строки таблицы
+    return db.scalar(select(func.count()).select_from(Mention).where(Mention.user_id == user_id)) or 0
+
+
 @app.get("/api/admin/users/{user_id}/overview", response_model=AdminUserOverviewOut)
-def get_admin_user_overview(
+async def get_admin_user_overview(
     user_id: int,
     _: User = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ) -> AdminUserOverviewOut:
-    _ensure_default_user(db)
-    target = db.scalar(select(User).where(User.id == user_id))
+    target = await run_in_threadpool(db.scalar, select(User).where(User.id == user_id))
     if not target:
         raise HTTPException(status_code=404, detail="user not found")
     plan = get_effective_plan(target)
-    limits_dict = get_limits(plan, db)
-    usage = _usage_counts(db, target.id)
-    own_channels, subscribed_channels = _admin_user_channels(db, target.id)
-    keywords = _keywords_out_by_user_id(db, target.id)
-    mentions_count = db.scalar(select(func.count(Mention.id)).where(Mention.user_id == target.id)) or 0
+
+    def _cheap_reads() -> tuple[Any, ...]:
+        return (
+            get_limits(plan, db),
+            _usage_counts(db, target.id),
+            _admin_user_channels(db, target.id),
+            _keywords_out_by_user_id(db, target.id),
+        )
+
+    # Параллельно только COUNT упоминаний (самый долгий) в своей сессии; остальные лёгкие чтения —
+    # последовательно в сессии запроса. Так запрос держит не больше двух соединений пула.
+    (limits_dict, usage, (own_channels, subscribed_channels), keywords), mentions_count = await asyncio.gather(
+        run_in_threadpool(_cheap_reads),
+        run_in_threadpool(_in_own_session, _mentions_count_by_user_id, target.id),
+    )
     return AdminUserOverviewOut(
         user=_user_to_out(target),
-        limits=PlanLimitsOut(
-            maxGroups=limits_dict["max_groups"],
-            maxChannels=limits_dict["max_channels"],
-            maxKeywordsExact=limits_dict["max_keywords_exact"],
-            maxKeywordsSemantic=limits_dict["max_keywords_semantic"],
-            maxOwnChannels=limits_dict["max_own_channels"],
-            label=limits_dict.get("label", plan),
-        ),
+        limits=_plan_limits_out(plan, limits_dict),
         usage=PlanUsageOut(
             groups=usage["groups"],
             channels=usage["channels"],
@@ -3560,16 +3821,42 @@ def get_admin_user_mentions_count(
     source: str | None = None,
     db: Session = Depends(get_db),
 ) -> MentionsCountOut:
-    _ensure_default_user(db)
     exists = db.scalar(select(User.id).where(User.id == user_id))
     if not exists:
         raise HTTPException(status_code=404, detail="user not found")
-    stmt = select(func.count(Mention.id))
+    stmt = select(func.count()).select_from(Mention)
     stmt = _mentions_filter_stmt(stmt, user_id, False, keyword, search, source)
     total = db.scalar(stmt) or 0
     return MentionsCountOut(total=total)
 
 
+def _build_admin_mentions_fallback_stmts() -> dict[tuple[bool, bool, str], Any]:
+    """Готовые text()-запросы fallback'а админского списка упоминаний: (keyword?, search?, порядок)."""
+    stmts: dict[tuple[bool, bool, str], Any] = {}
+    for has_keyword in (False, True):
+        for has_search in (False, True):
+            for order_sql in ("DESC", "ASC"):
+                where_sql = "WHERE user_id = :user_id"
+                if has_keyword:
+                    where_sql += " AND keyword_text = :keyword"
+                if has_search:
+                    where_sql += " AND message_text ILIKE :search"
+                stmts[(has_keyword, has_search, order_sql)] = text(
+                    "SELECT id, chat_name, chat_username, sender_name, sender_id, sender_phone, "
+                    "message_text, keyword_text, is_lead, is_read, created_at, chat_id, message_id "
+                    "FROM mentions "
+                    f"{where_sql} "
+                    f"ORDER BY created_at {order_sql}, id {order_sql} "
+                    "OFFSET :offset LIMIT :limit"
+                )
+    return stmts
+
+
+# Один и тот же объект TextClause на каждую комбинацию фильтров — SQL не собирается заново,
+# а скомпилированная форма берётся из кэша SQLAlchemy.
+_ADMIN_MENTIONS_FALLBACK_STMTS = _build_admin_mentions_fallback_stmts()
+
+
 @app.get("/api/admin/users/{user_id}/mentions", response_model=list[MentionOut])
 def get_admin_user_mentions(
     user_id: int,
@@ -3582,7 +3869,6 @@ def get_admin_user_mentions(
     sortOrder: Literal["desc", "asc"] = "desc",
     db: Session = Depends(get_db),
 ) -> list[MentionOut]:
-    _ensure_default_user(db)
     exists = db.scalar(select(User.id).where(User.id == user_id))
     if not exists:
         raise HTTPException(status_code=404, detail="user not found")
@@ -3592,44 +3878,39 @@ def get_admin_user_mentions(
     stmt = _mentions_filter_stmt(stmt, user_id, False, keyword, search, source)
     order = desc(Mention.created_at) if sortOrder == "desc" else Mention.created_at
     try:
-        rows = db.scalars(stmt.order_by(order).offset(offset).limit(limit)).all()
-        return [_mention_to_front(m) for m in rows]
+        # Страница до 500 строк: читаем порциями через серверный курсор и сразу конвертируем,
+        # не держа в памяти одновременно весь список ORM-объектов и список ответов.
+        rows = db.scalars(
+            stmt.order_by(order).offset(offset).limit(limit).execution_options(yield_per=100)
+        )
+        now = _now_utc()
+        return [_mention_to_front(m, now) for m in rows]
     except (OperationalError, ProgrammingError):
         # Fallback для старых БД, где в mentions могут отсутствовать новые колонки.
-        where_sql = "WHERE user_id = :user_id"
         params: dict[str, Any] = {
             "user_id": user_id,
             "limit": limit,
             "offset": offset,
         }
-        if keyword is not None and keyword.strip():
-            where_sql += " AND keyword_text = :keyword"
+        has_keyword = keyword is not None and bool(keyword.strip())
+        has_search = search is not None and bool(search.strip())
+        if has_keyword:
             params["keyword"] = keyword.strip()
-        if search is not None and search.strip():
-            where_sql += " AND message_text ILIKE :search"
+        if has_search:
             params["search"] = f"%{search.strip()}%"
         order_sql = "DESC" if sortOrder == "desc" else "ASC"
-        rows = db.execute(
-            text(
-                "SELECT id, chat_name, chat_username, sender_name, sender_id, sender_phone, "
-                "message_text, keyword_text, is_lead, is_read, created_at, chat_id, message_id "
-                "FROM mentions "
-                f"{where_sql} "
-                f"ORDER BY created_at {order_sql}, id {order_sql} "
-                "OFFSET :offset LIMIT :limit"
-            ),
-            params,
-        ).mappings().all()
+        fallback_stmt = _ADMIN_MENTIONS_FALLBACK_STMTS[(has_keyword, has_search, order_sql)]
+        rows = db.execute(fallback_stmt, params).mappings().all()
         out: list[MentionOut] = []
+        now = _now_utc()
         for r in rows:
-            created_at = r.get("created_at") or _now_utc()
+            created_at = r.get("created_at") or now
             if isinstance(created_at, str):
                 try:
                     created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
                 except ValueError:
-                    created_at = _now_utc()
-            if created_at.tzinfo is None:
-                created_at = created_at.replace(tzinfo=timezone.utc)
+                    created_at = now
+            created_at = _as_utc(created_at)
             group_name = (r.get("chat_name") or r.get("chat_username") or "Неизвестный чат").strip()
             user_name = (r.get("sender_name") or "Неизвестный пользователь").strip()
             sender_id = r.get("sender_id")
@@ -3645,7 +3926,7 @@ def get_admin_user_mentions(
                     senderPhone=sender_phone,
                     message=(r.get("message_text") or ""),
                     keyword=(r.get("keyword_text") or ""),
-                    timestamp=_humanize_ru(created_at),
+                    timestamp=_humanize_ru(created_at, now),
                     isLead=bool(r.get("is_lead")),
                     isRead=bool(r.get("is_read")),
                     createdAt=created_at.isoformat(),
@@ -3661,12 +3942,14 @@ def get_admin_user_mentions(
 @app.get("/api/admin/plan-limits", response_model=list[AdminPlanLimitOut])
 def get_admin_plan_limits(_: User = Depends(get_current_admin), db: Session = Depends(get_db)) -> list[AdminPlanLimitOut]:
     """Список лимитов всех тарифов (из БД или значения по умолчанию)."""
-    _ensure_default_user(db)
+    # Все строки plan_limits одним запросом и без кэша: админка должна видеть актуальные значения
+    rows = {r.plan_slug: r for r in db.scalars(select(PlanLimit).where(PlanLimit.plan_slug.in_(PLAN_ORDER)))}
     out: list[AdminPlanLimitOut] = []
     for slug in PLAN_ORDER:
-        limits = get_limits(slug, db)
+        row = rows.get(slug)
+        limits = limits_from_row(row) if row is not None else LIMITS.get(slug, LIMITS[PLAN_FREE]).copy()
         out.append(
-            AdminPlanLimitOut(
+            AdminPlanLimitOut.model_construct(
                 planSlug=slug,
                 label=limits.get("label", slug),
                 maxGroups=limits["max_groups"],
@@ -3687,7 +3970,6 @@ def update_admin_plan_limit(
     db: Session = Depends(get_db),
 ) -> AdminPlanLimitOut:
     """Обновить лимиты тарифа. Создаёт или обновляет строку в plan_limits."""
-    _ensure_default_user(db)
     row = db.get(PlanLimit, body.planSlug)
     if row is None:
         row = PlanLimit(
@@ -3710,6 +3992,8 @@ def update_admin_plan_limit(
         row.label = body.label
         row.can_track = body.canTrack
     db.commit()
+    invalidate_limits_cache()
+    _invalidate_plan_cache()
     db.refresh(row)
     return AdminPlanLimitOut(
         planSlug=row.plan_slug,
@@ -3968,6 +4252,7 @@ def _run_linked_backfill_job(force: bool) -> None:
     parser_log_append(f"Запуск TG linked-chat backfill (force={force}).")
     try:
         result = _backfill_telegram_linked_chats_once(force=force)
+        _invalidate_plan_cache()
         with _linked_backfill_lock:
             _linked_backfill_state["lastResult"] = result
         parser_log_append(
@@ -4134,62 +4419,59 @@ def backfill_linked_chats_status(_: User = Depends(get_current_admin)) -> dict[s
 @app.get("/api/chats/available", response_model=list[ChatAvailableOut])
 def list_available_chats(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> list[ChatAvailableOut]:
     """Глобальные каналы (добавленные администратором), доступные для подписки."""
-    _ensure_default_user(db)
     rows = db.scalars(
         select(Chat)
         .where(Chat.is_global.is_(True))
         .order_by(Chat.id.asc())
-        .options(selectinload(Chat.groups))
-    ).all()
-    sub_rows = db.execute(
-        select(user_chat_subscriptions.c.chat_id).where(user_chat_subscriptions.c.user_id == user.id)
+        # Нужны только группы; прочие связи не грузим — случайный lazy load на каждый канал упадёт сразу
+        .options(selectinload(Chat.groups), raiseload("*"))
     ).all()
-    sub_ids = {r[0] for r in sub_rows}
-    bundle_sizes: dict[str, int] = {}
-    for c in rows:
-        if (getattr(c, "source", None) or CHAT_SOURCE_TELEGRAM) != CHAT_SOURCE_TELEGRAM:
-            continue
-        key = (getattr(c, "billing_key", None) or "").strip()
-        if not key:
-            continue
-        bundle_sizes[key] = bundle_sizes.get(key, 0) + 1
-    sub_enabled: dict[int, bool] = {cid: True for cid in sub_ids}
-    try:
-        sub_enabled_rows = db.execute(
+    # Подписки пользователя и их вкл/выкл — одним запросом (колонку enabled добавляет init_db)
+    sub_enabled: dict[int, bool] = {
+        chat_id: True if enabled is None else bool(enabled)
+        for chat_id, enabled in db.execute(
             select(user_chat_subscriptions.c.chat_id, user_chat_subscriptions.c.enabled).where(
                 user_chat_subscriptions.c.user_id == user.id
             )
+        )
+    }
+    # Размеры бандлов (канал + discussion-чат с общим billing_key) считает БД
+    bundle_key = func.trim(Chat.billing_key)
+    bundle_sizes: dict[str, int] = dict(
+        db.execute(
+            select(bundle_key, func.count())
+            .where(
+                Chat.is_global.is_(True),
+                func.coalesce(Chat.source, CHAT_SOURCE_TELEGRAM) == CHAT_SOURCE_TELEGRAM,
+                bundle_key != "",
+            )
+            .group_by(bundle_key)
         ).all()
-        for r in sub_enabled_rows:
-            sub_enabled[r[0]] = r[1] if (len(r) > 1 and r[1] is not None) else True
-    except Exception:
-        pass  # колонка enabled может отсутствовать до миграции
+    )
     out: list[ChatAvailableOut] = []
     for c in rows:
-        created_at = c.created_at
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
         ident_display = (
             (c.username or "")
             or (str(c.tg_chat_id) if c.tg_chat_id is not None else "")
             or (f"t.me/joinchat/{c.invite_hash}" if getattr(c, "invite_hash", None) else "")
         ) or "—"
         group_names = [g.name for g in (c.groups or [])]
-        key = (getattr(c, "billing_key", None) or "").strip()
-        bundle_size = bundle_sizes.get(key, 1) if key else 1
+        bk = c.billing_key
+        is_telegram = (c.source or CHAT_SOURCE_TELEGRAM) == CHAT_SOURCE_TELEGRAM
+        bundle_size = bundle_sizes.get(bk.strip(), 1) if (bk and is_telegram) else 1
         out.append(
-            ChatAvailableOut(
+            ChatAvailableOut.model_construct(
                 id=c.id,
                 identifier=ident_display,
                 title=c.title,
                 description=c.description,
                 groupNames=group_names,
                 enabled=bool(c.enabled),
-                subscribed=c.id in sub_ids,
-                subscriptionEnabled=sub_enabled.get(c.id) if c.id in sub_ids else None,
+                subscribed=c.id in sub_enabled,
+                subscriptionEnabled=sub_enabled.get(c.id),
                 hasLinkedChat=bundle_size > 1,
                 bundleSize=bundle_size,
-                createdAt=created_at.isoformat(),
+                createdAt=_iso_utc(c.created_at),
             )
         )
     return out
@@ -4202,41 +4484,24 @@ def subscribe_by_identifier(
     db: Session = Depends(get_db),
 ) -> ChatOut:
     """Подписаться на глобальный канал по ссылке, @username или chat_id."""
-    _ensure_default_user(db)
     _check_plan_can_track(user)
     username, tg_chat_id, invite_hash = _parse_chat_identifier(body.identifier)
 
-    c = None
+    # Все способы опознать канал — одним запросом; приоритет прежний: tg_chat_id, username, invite_hash, id MAX
+    matches = []
     if tg_chat_id is not None:
-        c = db.scalar(
-            select(Chat).where(
-                Chat.is_global.is_(True),
-                Chat.tg_chat_id == tg_chat_id,
-            )
-        )
-    if c is None and username:
-        c = db.scalar(
-            select(Chat).where(
-                Chat.is_global.is_(True),
-                Chat.username == username,
-            )
-        )
-    if c is None and invite_hash:
-        c = db.scalar(
-            select(Chat).where(
-                Chat.is_global.is_(True),
-                Chat.invite_hash == invite_hash,
-            )
-        )
-    if c is None:
-        ident_stripped = body.identifier.strip()
-        c = db.scalar(
-            select(Chat).where(
-                Chat.is_global.is_(True),
-                Chat.source == CHAT_SOURCE_MAX,
-                Chat.max_chat_id == ident_stripped,
-            )
-        )
+        matches.append((Chat.tg_chat_id == tg_chat_id, 0))
+    if username:
+        matches.append((Chat.username == username, 1))
+    if invite_hash:
+        matches.append((Chat.invite_hash == invite_hash, 2))
+    matches.append((and_(Chat.source == CHAT_SOURCE_MAX, Chat.max_chat_id == body.identifier.strip()), 3))
+    c = db.scalar(
+        select(Chat)
+        .where(Chat.is_global.is_(True), or_(*(cond for cond, _ in matches)))
+        .order_by(case(*matches), Chat.id.asc())
+        .limit(1)
+    )
     if not c:
         raise HTTPException(
             status_code=404,
@@ -4247,6 +4512,7 @@ def subscribe_by_identifier(
         _check_limits(db, user, delta_channels=1)
     _upsert_individual_subscriptions(db, user.id, bundle_chats)
     db.commit()
+    _invalidate_plan_cache(user.id)
     db.refresh(c)
     return _chat_to_out(c, is_owner=False, db=db)
 
@@ -4264,6 +4530,7 @@ def subscribe_chat(chat_id: int, user: User = Depends(get_current_user), db: Ses
         _check_limits(db, user, delta_channels=1)
     _upsert_individual_subscriptions(db, user.id, bundle_chats)
     db.commit()
+    _invalidate_plan_cache(user.id)
     db.refresh(c)
     return _chat_to_out(c, is_owner=False, db=db)
 
@@ -4300,20 +4567,24 @@ def update_chat_subscription(
             c.enabled = enabled_value
             db.add(c)
         db.commit()
+        _invalidate_plan_cache(user.id)
         db.refresh(c)
         return _chat_to_out(c, is_owner=True, db=db)
-    sub = db.execute(
-        select(user_chat_subscriptions).where(
-            user_chat_subscriptions.c.user_id == user.id,
-            user_chat_subscriptions.c.chat_id == chat_id,
+    has_sub = db.scalar(
+        select(
+            exists().where(
+                user_chat_subscriptions.c.user_id == user.id,
+                user_chat_subscriptions.c.chat_id == chat_id,
+            )
         )
-    ).first()
-    if not sub:
+    )
+    if not has_sub:
         # Без подписки: при включении глобального канала создаём подписку на весь бандл.
         if bool(body.enabled) and bool(c.is_global):
             bundle_chats = _bundle_global_chats(db, c)
             _upsert_individual_subscriptions(db, user.id, bundle_chats)
             db.commit()
+            _invalidate_plan_cache(user.id)
             db.refresh(c)
             return _chat_to_out(c, is_owner=False, subscription_enabled=True, db=db)
         raise HTTPException(status_code=404, detail="subscription not found")
@@ -4329,6 +4600,7 @@ def update_chat_subscription(
             .values(enabled=body.enabled)
         )
         db.commit()
+        _invalidate_plan_cache(user.id)
     except Exception:
         raise HTTPException(status_code=500, detail="subscription update not supported (migrate DB)")
     db.refresh(c)
@@ -4349,6 +4621,7 @@ def unsubscribe_chat(chat_id: int, user: User = Depends(get_current_user), db: S
         )
     )
     db.commit()
+    _invalidate_plan_cache(user.id)
     if deleted.rowcount == 0:
         raise HTTPException(status_code=404, detail="subscription not found")
     return {"ok": True}
@@ -4371,11 +4644,15 @@ def delete_chat(chat_id: int, user: User = Depends(get_current_user), db: Sessio
                 )
             )
             db.commit()
+            _invalidate_plan_cache(None if user.is_admin else user.id)
             if r.rowcount:
                 return {"ok": True}
         raise HTTPException(status_code=403, detail="forbidden")
     db.delete(c)
     db.commit()
+    _invalidate_plan_cache(None if user.is_admin else user.id)
+    if user.is_admin:
+        _invalidate_chat_group_catalog()
     return {"ok": True}
 
 
@@ -4409,16 +4686,15 @@ def _group_keys():
     ]
 
 
-def _row_to_group_out(row) -> MentionGroupOut:
+def _row_to_group_out(row, now: datetime | None = None) -> MentionGroupOut:
     """Собрать MentionGroupOut из строки сгруппированного запроса."""
     group_name = (row.chat_name or row.chat_username or "Неизвестный чат").strip()
     user_name = (row.sender_name or "Неизвестный пользователь").strip()
-    created_at = row.created_at
-    if created_at.tzinfo is None:
-        created_at = created_at.replace(tzinfo=timezone.utc)
+    created_at = _as_utc(row.created_at)
     user_link = None
-    if getattr(row, "sender_username", None) and str(row.sender_username).strip():
-        user_link = f"https://t.me/{str(row.sender_username).strip().lstrip('@')}"
+    sender_uname = _clean_username(getattr(row, "sender_username", None))
+    if sender_uname:
+        user_link = f"https://t.me/{sender_uname}"
     elif getattr(row, "sender_id", None) is not None:
         user_link = f"tg://user?id={row.sender_id}"
     sender_phone = (getattr(row, "sender_phone", None) or "").strip() or None
@@ -4446,7 +4722,7 @@ def _row_to_group_out(row) -> MentionGroupOut:
         message=(row.message_text or ""),
         keywords=keywords,
         matchedSpans=matched_spans_out if matched_spans_out else None,
-        timestamp=_humanize_ru(created_at),
+        timestamp=_humanize_ru(created_at, now),
         isLead=bool(row.is_lead),
         isRead=bool(row.is_read),
         createdAt=created_at.isoformat(),
@@ -4467,15 +4743,13 @@ def count_mentions(
     grouped: bool = False,
     db: Session = Depends(get_db),
 ) -> MentionsCountOut:
-    _ensure_default_user(db)
     if grouped:
-        stmt = (
-            select(*_group_keys())
-            .where(Mention.user_id == user.id)
-        )
+        # Группа — одно сообщение (см. _same_group_where): считаем различные ключи сообщения
+        # одним проходом, без подзапроса с GROUP BY по всем колонкам группы
+        message_key = tuple_(Mention.user_id, Mention.chat_id, Mention.message_id, Mention.created_at)
+        stmt = select(func.count(distinct(message_key))).select_from(Mention)
         stmt = _mentions_filter_stmt(stmt, user.id, unreadOnly, keyword, search, source)
-        subq = stmt.group_by(*_group_keys()).subquery()
-        total = db.scalar(select(func.count()).select_from(subq)) or 0
+        total = db.scalar(stmt) or 0
     else:
         stmt = select(func.count(Mention.id))
         stmt = _mentions_filter_stmt(stmt, user.id, unreadOnly, keyword, search, source)
@@ -4496,7 +4770,6 @@ def list_mentions(
     grouped: bool = False,
     db: Session = Depends(get_db),
 ) -> list[MentionOut] | list[MentionGroupOut]:
-    _ensure_default_user(db)
     limit = max(1, min(500, limit))
     offset = max(0, offset)
     if grouped:
@@ -4514,8 +4787,10 @@ def list_mentions(
             Mention.sender_username,
             Mention.sender_phone,
             Mention.source,
-            func.array_agg(Mention.keyword_text).label("keywords"),
-            func.array_agg(Mention.semantic_matched_span).label("matched_spans"),
+            # Оба массива в порядке id: i-й фрагмент относится к i-му слову, первое вхождение детерминировано.
+            # DISTINCT внутри array_agg не подходит — PostgreSQL не даст с ним ORDER BY id и разъедется пара слово/фрагмент.
+            func.array_agg(aggregate_order_by(Mention.keyword_text, Mention.id)).label("keywords"),
+            func.array_agg(aggregate_order_by(Mention.semantic_matched_span, Mention.id)).label("matched_spans"),
             func.bool_or(Mention.is_lead).label("is_lead"),
             func.bool_and(Mention.is_read).label("is_read"),
             func.max(Mention.semantic_similarity).label("max_semantic_similarity"),
@@ -4542,7 +4817,7 @@ def list_mentions(
                 Mention.sender_username,
                 Mention.sender_phone,
                 Mention.source,
-                func.array_agg(Mention.keyword_text).label("keywords"),
+                func.array_agg(aggregate_order_by(Mention.keyword_text, Mention.id)).label("keywords"),
                 func.bool_or(Mention.is_lead).label("is_lead"),
                 func.bool_and(Mention.is_read).label("is_read"),
                 func.max(Mention.semantic_similarity).label("max_semantic_similarity"),
@@ -4551,7 +4826,8 @@ def list_mentions(
             stmt_fallback = stmt_fallback.group_by(*_group_keys()).order_by(order).offset(offset).limit(limit)
             rows = db.execute(stmt_fallback).all()
             # у fallback-строк нет matched_spans — _row_to_group_out возьмёт getattr(..., None)
-        return [_row_to_group_out(row) for row in rows]
+        now = _now_utc()
+        return [_row_to_group_out(row, now) for row in rows]
     stmt = select(Mention)
     stmt = _mentions_filter_stmt(stmt, user.id, unreadOnly, keyword, search, source)
     order = desc(Mention.created_at) if sortOrder == "desc" else Mention.created_at
@@ -4560,12 +4836,46 @@ def list_mentions(
             stmt.order_by(order).offset(offset).limit(limit)
         ).all()
     )
-    return [_mention_to_front(m) for m in rows]
+    now = _now_utc()
+    return [_mention_to_front(m, now) for m in rows]
 
 
 _EXPORT_MAX = 10_000
 
 
+_EXPORT_CHUNK_ROWS = 1000
+
+
+def _iter_mentions_csv(db: Session, stmt) -> Iterator[bytes]:
+    """CSV выгрузки порциями по _EXPORT_CHUNK_ROWS строк: строки читаются серверным курсором и сразу уходят клиенту.
+    db — сессия запроса: yield-зависимость get_db закрывается только после отправки ответа, так что генератор
+    дочитывает через то же соединение, что уже взято для get_current_user, а не занимает второе из пула."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(
+        ["id", "created_at", "source", "chat", "sender", "phone", "message", "keyword", "is_lead", "is_read", "user_link"]
+    )
+    yield out.getvalue().encode("utf-8-sig")  # BOM — чтобы Excel открыл файл в UTF-8
+    out.seek(0)
+    out.truncate(0)
+    for i, m in enumerate(db.scalars(stmt.execution_options(yield_per=_EXPORT_CHUNK_ROWS)), start=1):
+        created = m.created_at.isoformat() if m.created_at else ""
+        src = getattr(m, "source", None) or "telegram"
+        chat = (m.chat_name or m.chat_username or "").strip()
+        sender = (m.sender_name or "").strip()
+        phone = (getattr(m, "sender_phone", None) or "").strip()
+        user_link = _user_profile_link(m) or ""
+        writer.writerow(
+            [str(m.id), created, src, chat, sender, phone, (m.message_text or ""), m.keyword_text, m.is_lead, m.is_read, user_link]
+        )
+        if i % _EXPORT_CHUNK_ROWS == 0:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate(0)
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+
 @app.get("/api/mentions/export")
 def export_mentions_csv(
     user: User = Depends(get_current_user),
@@ -4576,7 +4886,6 @@ def export_mentions_csv(
     dateTo: str | None = None,
     db: Session = Depends(get_db),
 ) -> Response:
-    _ensure_default_user(db)
     stmt = select(Mention).where(Mention.user_id == user.id)
     if keyword is not None and keyword.strip():
         stmt = stmt.where(Mention.keyword_text == keyword.strip())
@@ -4587,40 +4896,20 @@ def export_mentions_csv(
     if dateFrom:
         try:
             dt_from = datetime.fromisoformat(dateFrom.replace("Z", "+00:00"))
-            if dt_from.tzinfo is None:
-                dt_from = dt_from.replace(tzinfo=timezone.utc)
+            dt_from = _as_utc(dt_from)
             stmt = stmt.where(Mention.created_at >= dt_from)
         except ValueError:
             pass
     if dateTo:
         try:
             dt_to = datetime.fromisoformat(dateTo.replace("Z", "+00:00"))
-            if dt_to.tzinfo is None:
-                dt_to = dt_to.replace(tzinfo=timezone.utc)
+            dt_to = _as_utc(dt_to)
             stmt = stmt.where(Mention.created_at <= dt_to)
         except ValueError:
             pass
-    rows = db.scalars(
-        stmt.order_by(desc(Mention.created_at)).limit(_EXPORT_MAX)
-    ).all()
-    out = io.StringIO()
-    writer = csv.writer(out)
-    writer.writerow(
-        ["id", "created_at", "source", "chat", "sender", "phone", "message", "keyword", "is_lead", "is_read", "user_link"]
-    )
-    for m in rows:
-        created = m.created_at.isoformat() if m.created_at else ""
-        src = getattr(m, "source", None) or "telegram"
-        chat = (m.chat_name or m.chat_username or "").strip()
-        sender = (m.sender_name or "").strip()
-        phone = (getattr(m, "sender_phone", None) or "").strip()
-        user_link = _user_profile_link(m) or ""
-        writer.writerow(
-            [str(m.id), created, src, chat, sender, phone, (m.message_text or ""), m.keyword_text, m.is_lead, m.is_read, user_link]
-        )
-    body = out.getvalue().encode("utf-8-sig")
-    return Response(
-        content=body,
+    stmt = stmt.order_by(desc(Mention.created_at)).limit(_EXPORT_MAX)
+    return StreamingResponse(
+        _iter_mentions_csv(db, stmt),
         media_type="text/csv; charset=utf-8",
         headers={"Content-Disposition": "attachment; filename=mentions.csv"},
     )
@@ -4635,7 +4924,6 @@ def mark_all_mentions_read(
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> MarkAllReadOut:
-    _ensure_default_user(db)
     result = db.execute(
         update(Mention)
         .where(Mention.user_id == user.id, Mention.is_read.is_(False))
@@ -4686,6 +4974,18 @@ def set_mention_read(mention_id: int, body: MentionReadPatch, user: User = Depen
     return _mention_to_front(m)
 
 
+def _ws_init_mentions_payload(db: Session, user_id: int) -> list[dict[str, Any]]:
+    """Последние 50 упоминаний пользователя (старые первыми) для init-сообщения WebSocket."""
+    rows = db.scalars(
+        select(Mention)
+        .where(Mention.user_id == user_id)
+        .order_by(desc(Mention.created_at))
+        .limit(50)
+    ).all()
+    now = _now_utc()
+    return [_mention_to_front(m, now).model_dump() for m in rows][::-1]
+
+
 @app.websocket("/ws/mentions")
 async def ws_mentions(ws: WebSocket) -> None:
     # Токен в query: token=... (WebSocket не передаёт заголовки из браузера)
@@ -4698,17 +4998,9 @@ async def ws_mentions(ws: WebSocket) -> None:
     try:
         await ws.send_json({"type": "hello", "message": "connected"})
 
-        # Отдаем последние упоминания сразу после коннекта (удобно для фронта)
-        from database import SessionLocal
-
-        with SessionLocal() as db:
-            rows = db.scalars(
-                select(Mention)
-                .where(Mention.user_id == user_id)
-                .order_by(desc(Mention.created_at))
-                .limit(50)
-            ).all()
-            init_payload = [_mention_to_front(m).model_dump() for m in rows][::-1]
+        # Отдаем последние упоминания сразу после коннекта (удобно для фронта).
+        # Синхронный запрос — в threadpool, чтобы не останавливать event loop для остальных соединений.
+        init_payload = await run_in_threadpool(_in_own_session, _ws_init_mentions_payload, user_id)
         await ws.send_json({"type": "init", "data": init_payload})
 
         while True:
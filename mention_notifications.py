@@ -10,6 +10,7 @@
 from __future__ import annotations
 
 import logging
+import os
 import queue
 import threading
 
@@ -21,7 +22,9 @@ from models import Mention, NotificationSettings, User
 logger = logging.getLogger(__name__)
 
 _NOTIFY_QUEUE: queue.Queue[int | None] = queue.Queue(maxsize=2000)
-_NUM_WORKERS = 4
+# Воркеры — потоки: отправка email/Telegram блокирующая, но на время сетевого I/O GIL отпускается,
+# поэтому отправки разных упоминаний идут параллельно. Число — под всплески лидов.
+_NUM_WORKERS = max(1, int(os.getenv("MENTION_NOTIFY_WORKERS", "8")))
 
 
 def _notification_worker() -> None:
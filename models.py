@@ -9,6 +9,7 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Table,
@@ -50,6 +51,8 @@ user_thematic_group_subscriptions = Table(
 
 class User(Base):
     __tablename__ = "users"
+    # created_at и прочие server_default забираются тем же INSERT ... RETURNING — refresh после создания не нужен
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     email: Mapped[str | None] = mapped_column(String(320), unique=True, nullable=True, index=True)
@@ -86,7 +89,7 @@ class Keyword(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     exclusion_words: Mapped[list["ExclusionWord"]] = relationship(
-        back_populates="keyword", cascade="all, delete-orphan"
+        back_populates="keyword", cascade="all, delete-orphan", order_by="ExclusionWord.id"
     )
     user: Mapped["User"] = relationship(back_populates="keywords")
 
@@ -127,6 +130,9 @@ class Chat(Base):
     billing_key: Mapped[str | None] = mapped_column(String(128), nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+    # Размер бандла: WHERE billing_key = ? AND source = ? AND (is_global OR user_id = ?) — считается по индексу
+    __table_args__ = (Index("ix_chats_billing_key_source_user_global", "billing_key", "source", "user_id", "is_global"),)
+
     user: Mapped["User"] = relationship(back_populates="chats")
     groups: Mapped[list["ChatGroup"]] = relationship(
         secondary=chat_group_links,
@@ -140,6 +146,8 @@ class Chat(Base):
 
 class ChatGroup(Base):
     __tablename__ = "chat_groups"
+    # created_at забирается тем же INSERT ... RETURNING — refresh после создания не нужен
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
@@ -181,6 +189,7 @@ class PasswordResetToken(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    # blake2b-хэш токена (hex); сам токен уходит только в письме
     token: Mapped[str] = mapped_column(String(64), unique=True, nullable=False, index=True)
     expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
@@ -200,7 +209,8 @@ class Mention(Base):
     __tablename__ = "mentions"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    # Отдельный индекс по user_id не нужен: он префикс всех составных индексов ниже
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 
     source: Mapped[str] = mapped_column(String(32), nullable=False, default=CHAT_SOURCE_TELEGRAM, server_default="'telegram'", index=True)
     keyword_text: Mapped[str] = mapped_column(String(400), nullable=False, index=True)
@@ -229,6 +239,15 @@ class Mention(Base):
 
     user: Mapped["User"] = relationship(back_populates="mentions")
 
+    # Фильтры ленты/счётчиков всегда идут в паре с user_id: WHERE user_id = ? AND keyword_text|source|is_lead = ?
+    # Лента: WHERE user_id = ? [AND is_read = false] ORDER BY created_at DESC — без сортировки, is_read проверяется по индексу
+    __table_args__ = (
+        Index("ix_mentions_user_created_read", "user_id", created_at.desc(), "is_read"),
+        Index("ix_mentions_user_keyword", "user_id", "keyword_text"),
+        Index("ix_mentions_user_source", "user_id", "source"),
+        Index("ix_mentions_user_lead", "user_id", "is_lead"),
+    )
+
 
 # --- Поддержка пользователей (обращения к администратору) ---
 
@@ -247,10 +266,15 @@ class SupportTicket(Base):
 
     messages: Mapped[list["SupportMessage"]] = relationship(back_populates="ticket", cascade="all, delete-orphan", order_by="SupportMessage.created_at")
 
+    # Список тикетов пользователя: WHERE user_id = ? ORDER BY updated_at DESC
+    __table_args__ = (Index("ix_support_tickets_user_updated", "user_id", updated_at.desc()),)
+
 
 class SupportMessage(Base):
     """Сообщение в тикете поддержки (от пользователя или от сотрудника)."""
     __tablename__ = "support_messages"
+    # Для поиска непрочитанных ответов поддержки: ticket_id + is_from_staff + created_at
+    __table_args__ = (Index("ix_support_messages_ticket_staff_created", "ticket_id", "is_from_staff", "created_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     ticket_id: Mapped[int] = mapped_column(ForeignKey("support_tickets.id", ondelete="CASCADE"), index=True, nullable=False)
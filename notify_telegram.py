@@ -4,10 +4,9 @@ from __future__ import annotations
 import json
 import logging
 import os
-import urllib.error
-import urllib.parse
-import urllib.request
+import threading
 
+import requests
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,6 +19,17 @@ TELEGRAM_BOT_USERNAME = "telescopemsg_bot"
 NOTIFY_TELEGRAM_BOT_TOKEN = os.getenv("NOTIFY_TELEGRAM_BOT_TOKEN", "").strip()
 FRONTEND_URL = os.getenv("FRONTEND_URL", "").strip()
 
+# HTTP-сессия на поток: keep-alive к api.telegram.org, без нового TCP+TLS на каждое уведомление.
+# requests.Session не гарантирует потокобезопасность, поэтому воркеры уведомлений не делят одну сессию.
+_http_local = threading.local()
+
+
+def _http() -> requests.Session:
+    session = getattr(_http_local, "session", None)
+    if session is None:
+        session = _http_local.session = requests.Session()
+    return session
+
 
 def _normalize_button_url(url: str) -> str | None:
     """Вернуть URL, пригодный для inline-кнопки Telegram (только http/https). Исправляет опечатку htts -> https."""
@@ -56,25 +66,19 @@ def send_message(
     }
     if reply_markup:
         payload["reply_markup"] = json.dumps(reply_markup)
-    data = urllib.parse.urlencode(payload, encoding="utf-8").encode("utf-8")
-    req = urllib.request.Request(url, data=data, method="POST", headers={"Content-Type": "application/x-www-form-urlencoded; charset=utf-8"})
     try:
         logger.debug("Telegram sendMessage: запрос chat_id=%s text_len=%s", chat_id, len(text))
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            if resp.status == 200:
-                logger.debug("Telegram sendMessage: успех chat_id=%s", chat_id)
-                return True
-            body = resp.read().decode("utf-8", errors="replace")
-            logger.warning("Telegram API sendMessage вернул %s: %s", resp.status, body[:500])
-            return False
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="replace") if e.fp else ""
+        resp = _http().post(url, data=payload, timeout=15)
+        if resp.status_code == 200:
+            logger.debug("Telegram sendMessage: успех chat_id=%s", chat_id)
+            return True
+        body = resp.text
         try:
-            err = json.loads(body)
-            desc = err.get("description", body)
-        except Exception:
-            desc = body or str(e)
-        logger.warning("Telegram API ошибка (chat_id=%s, status=%s): %s", chat_id, e.code, desc)
+            err = resp.json()
+            desc = err.get("description", body) if isinstance(err, dict) else body
+        except ValueError:
+            desc = body
+        logger.warning("Telegram API ошибка (chat_id=%s, status=%s): %s", chat_id, resp.status_code, desc[:500])
         return False
     except Exception as e:
         logger.exception("Ошибка отправки сообщения в Telegram (chat_id=%s): %s", chat_id, e)
@@ -89,11 +93,9 @@ def answer_callback_query(callback_query_id: str, text: str | None = None) -> bo
     payload: dict[str, str] = {"callback_query_id": callback_query_id}
     if text:
         payload["text"] = text[:200]
-    data = urllib.parse.urlencode(payload).encode()
-    req = urllib.request.Request(url, data=data, method="POST", headers={"Content-Type": "application/x-www-form-urlencoded"})
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            return resp.status == 200
+        resp = _http().post(url, data=payload, timeout=10)
+        return resp.status_code == 200
     except Exception as e:
         logger.exception("Ошибка answerCallbackQuery: %s", e)
         return False
@@ -5,22 +5,60 @@
 from __future__ import annotations
 
 import os
+import threading
+import time
 from typing import Any
 
 from database import db_session
 from models import ParserSetting, User
 
 
+# Значения из parser_settings меняются редко (админка), а читаются на каждом TG-вызове:
+# кэшируем ответ БД на _SETTINGS_CACHE_TTL_SEC. set_parser_setting сбрасывает ключ сразу.
+# Поколение ключа растёт при каждом сбросе: чтение, начавшееся до записи, не положит в кэш старое значение.
+_SETTINGS_CACHE_TTL_SEC = 30.0
+_settings_cache: dict[str, tuple[float, str | None]] = {}
+_settings_gen: dict[str, int] = {}
+_settings_gen_all = 0
+_settings_lock = threading.Lock()
+
+
+def _invalidate_parser_settings_cache(key: str | None = None) -> None:
+    global _settings_gen_all
+    with _settings_lock:
+        if key is None:
+            _settings_gen_all += 1
+            _settings_cache.clear()
+        else:
+            _settings_gen[key] = _settings_gen.get(key, 0) + 1
+            _settings_cache.pop(key, None)
+
+
+def _settings_generation(key: str) -> tuple[int, int]:
+    return _settings_gen_all, _settings_gen.get(key, 0)
+
+
 def get_parser_setting(key: str, env_fallback: str | None = None) -> str | None:
     """Возвращает значение настройки: из БД, иначе из os.getenv(key) или env_fallback.
     При вызове из фонового потока БД может быть недоступна — тогда сразу env (без блокировки event loop)."""
-    try:
-        with db_session() as db:
-            row = db.get(ParserSetting, key)
-            if row is not None and row.value is not None and row.value.strip():
-                return row.value.strip()
-    except Exception:
-        pass
+    now = time.monotonic()
+    cached = _settings_cache.get(key)
+    if cached is not None and cached[0] > now:
+        db_value = cached[1]
+    else:
+        gen = _settings_generation(key)
+        try:
+            with db_session() as db:
+                row = db.get(ParserSetting, key)
+                db_value = row.value.strip() if row is not None and row.value is not None else None
+            with _settings_lock:
+                # Если за время чтения ключ сбросили — значение могло устареть, в кэш не кладём
+                if _settings_generation(key) == gen:
+                    _settings_cache[key] = (now + _SETTINGS_CACHE_TTL_SEC, db_value or None)
+        except Exception:
+            db_value = None
+    if db_value:
+        return db_value
     return os.getenv(key, env_fallback) or None
 
 
@@ -82,17 +120,21 @@ def get_user_semantic_min_topic_percent(user_id: int) -> float | None:
 
 def set_parser_setting(key: str, value: str | None) -> None:
     """Записать настройку в БД. value=None или пустая строка — удалить (будет использоваться env)."""
-    with db_session() as db:
-        row = db.get(ParserSetting, key)
-        val = (value or "").strip() or None
-        if val is None:
-            if row is not None:
-                db.delete(row)
-            return
-        if row is None:
-            db.add(ParserSetting(key=key, value=val))
-        else:
-            row.value = val
+    try:
+        with db_session() as db:
+            row = db.get(ParserSetting, key)
+            val = (value or "").strip() or None
+            if val is None:
+                if row is not None:
+                    db.delete(row)
+                return
+            if row is None:
+                db.add(ParserSetting(key=key, value=val))
+            else:
+                row.value = val
+    finally:
+        # Сброс после коммита поднимает поколение ключа: параллельное чтение, начатое до коммита, не закэширует старое значение
+        _invalidate_parser_settings_cache(key)
 
 
 def get_all_parser_settings() -> dict[str, str]:
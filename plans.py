@@ -5,6 +5,7 @@
 """
 from __future__ import annotations
 
+import time
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Any
 
@@ -62,24 +63,48 @@ LIMITS = {
 }
 
 
+# Лимиты из plan_limits меняются только из админки, а читаются на каждый запрос/скан парсера.
+# Ключ — plan_slug; значение None означает «строки в БД нет, берём LIMITS».
+_LIMITS_CACHE_TTL_SEC = 60.0
+_limits_cache: dict[str, tuple[float, dict[str, Any] | None]] = {}
+
+
+def invalidate_limits_cache() -> None:
+    """Сбросить кэш лимитов (после изменения plan_limits). Другие процессы увидят изменения через TTL."""
+    _limits_cache.clear()
+
+
+def limits_from_row(row: Any) -> dict[str, Any]:
+    """Словарь лимитов из строки PlanLimit."""
+    return {
+        "max_groups": row.max_groups,
+        "max_channels": row.max_channels,
+        "max_keywords_exact": row.max_keywords_exact,
+        "max_keywords_semantic": row.max_keywords_semantic,
+        "max_own_channels": row.max_own_channels,
+        "label": row.label,
+        "can_track": row.can_track,
+    }
+
+
 def get_limits(plan_slug: str, db: "Session | None" = None) -> dict[str, Any]:
     """
     Возвращает лимиты для плана. Для неизвестного плана — лимиты free.
-    Если передан db и в таблице plan_limits есть строка для плана — используются значения из БД.
+    Если передан db и в таблице plan_limits есть строка для плана — используются значения из БД
+    (кэшируются на _LIMITS_CACHE_TTL_SEC).
     """
     if db is not None:
-        from models import PlanLimit
-        row = db.get(PlanLimit, plan_slug)
-        if row is not None:
-            return {
-                "max_groups": row.max_groups,
-                "max_channels": row.max_channels,
-                "max_keywords_exact": row.max_keywords_exact,
-                "max_keywords_semantic": row.max_keywords_semantic,
-                "max_own_channels": row.max_own_channels,
-                "label": row.label,
-                "can_track": row.can_track,
-            }
+        now = time.monotonic()
+        cached = _limits_cache.get(plan_slug)
+        if cached is not None and cached[0] > now:
+            db_limits = cached[1]
+        else:
+            from models import PlanLimit
+            row = db.get(PlanLimit, plan_slug)
+            db_limits = limits_from_row(row) if row is not None else None
+            _limits_cache[plan_slug] = (now + _LIMITS_CACHE_TTL_SEC, db_limits)
+        if db_limits is not None:
+            return db_limits.copy()
     return LIMITS.get(plan_slug, LIMITS[PLAN_FREE]).copy()
 
 
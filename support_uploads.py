@@ -5,6 +5,7 @@ import os
 import re
 import uuid
 from pathlib import Path
+from typing import BinaryIO
 
 from dotenv import load_dotenv
 
@@ -12,7 +13,10 @@ load_dotenv()
 
 # Каталог для загрузок (относительно CWD или абсолютный)
 SUPPORT_UPLOAD_DIR = os.getenv("SUPPORT_UPLOAD_DIR", "").strip() or os.path.join(os.getcwd(), "data", "support_uploads")
+# Префикс internal-location nginx для X-Accel-Redirect (например /_protected_uploads/). Пусто — отдаём файл сами.
+ACCEL_REDIRECT_PREFIX = os.getenv("SUPPORT_ACCEL_REDIRECT_PREFIX", "").strip()
 MAX_FILE_SIZE_BYTES = 5 * 1024 * 1024  # 5 MB
+COPY_CHUNK_BYTES = 64 * 1024
 RETENTION_DAYS = 30
 
 # Безопасное расширение из имени файла (только буквы, цифры, точка)
@@ -38,17 +42,36 @@ def get_path(stored_filename: str) -> Path:
     return get_upload_dir() / stored_filename
 
 
-def save_file(content: bytes, original_filename: str, content_type: str | None) -> tuple[str, int]:
+class FileTooLargeError(ValueError):
+    """Файл превышает MAX_FILE_SIZE_BYTES."""
+
+
+def save_stream(src: BinaryIO, original_filename: str, content_type: str | None) -> tuple[str, int]:
     """
-    Сохранить файл на диск. Возвращает (stored_filename, size_bytes).
-    Вызывающий должен проверить size <= MAX_FILE_SIZE_BYTES до вызова.
+    Сохранить файл на диск, копируя его кусками по COPY_CHUNK_BYTES (без чтения целиком в память).
+    Размер проверяется по мере копирования: при превышении лимита частичный файл удаляется
+    и поднимается FileTooLargeError. Пишем во временный *.part и переименовываем по завершении,
+    чтобы под итоговым именем никогда не лежал недописанный файл. Возвращает (stored_filename, size_bytes).
     """
-    if len(content) > MAX_FILE_SIZE_BYTES:
-        raise ValueError(f"File size exceeds {MAX_FILE_SIZE_BYTES} bytes")
     stored = make_stored_filename(original_filename or "file")
     path = get_path(stored)
-    path.write_bytes(content)
-    return stored, len(content)
+    tmp_path = path.with_name(stored + ".part")
+    size = 0
+    try:
+        with tmp_path.open("wb") as dst:
+            while True:
+                chunk = src.read(COPY_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_FILE_SIZE_BYTES:
+                    raise FileTooLargeError(f"File size exceeds {MAX_FILE_SIZE_BYTES} bytes")
+                dst.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return stored, size
 
 
 def delete_file(stored_filename: str) -> None: